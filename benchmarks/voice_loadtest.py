@@ -0,0 +1,419 @@
+# coding=utf-8
+"""
+Offline load test for the voice plugin.
+
+Drives hundreds of simulated servers through JoinVoiceChannel, play,
+stop and LeaveVoiceChannel without Discord or YouTube. Every server
+gets a fake VoiceClient whose ffmpeg players stream synthetic PCM (or
+the raw PCM of a local file) through the real discord.py StreamPlayer,
+and youtube_dl is replaced by a stub resolver.
+
+The plugin finds voice.json in the resources folder of the bot
+through sys.path[0], so pass the bot folder with --bot-dir (it
+defaults to the current folder). The caches go to a temporary folder
+that is removed afterwards, and the parts of the plugin that would
+start ffmpeg or write the play history are turned off:
+
+    python path/to/plugins/benchmarks/voice_loadtest.py \
+        --bot-dir path/to/bot --servers 200
+"""
+import argparse
+import asyncio
+import io
+import math
+import os
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import discord
+
+# the voice plugin is in the folder above this one.
+sys.path.insert(1, os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+import voice  # noqa: E402
+
+# 20 ms of 48 kHz 16 bit stereo PCM.
+FRAME_SIZE = 3840
+
+
+def make_pcm(seconds):
+    """
+    Makes a 440 Hz tone as raw PCM.
+    """
+    samples = []
+    for i in range(int(48000 * seconds)):
+        sample = int(8000 * math.sin(2 * math.pi * 440 * i / 48000))
+        samples.append(struct.pack('<hh', sample, sample))
+    return b''.join(samples)
+
+
+class Stats:
+    """
+    Counters shared by the fake players and the fake bot.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.messages = 0
+        self.commands = 0
+        # frames of the song of every player that played it to the end.
+        self.songs = []
+
+
+class FakeEncoder:
+    """
+    The parts of discord.opus.Encoder StreamPlayer uses.
+    """
+
+    def __init__(self, frame_length):
+        self.frame_size = FRAME_SIZE
+        self.frame_length = frame_length
+
+    def set_bitrate(self, kbps):
+        self.bitrate = kbps
+
+    def set_bandwidth(self, bandwidth):
+        self.bandwidth = bandwidth
+
+
+class FakeProcess:
+    """
+    Stands in for the ffmpeg process of a player.
+    """
+
+    def __init__(self, player, stream):
+        self.player = player
+        self.stdout = stream
+        with stream.getbuffer() as view:
+            self.size = view.nbytes
+        self.returncode = None
+
+    def poll(self):
+        # like ffmpeg it exits once all of its output was read.
+        if self.returncode is None and self.stdout.tell() >= self.size:
+            self.returncode = 0
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            self.player.stop()
+            self.returncode = -9
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def communicate(self):
+        return None, None
+
+
+class FakePlayer(discord.voice_client.StreamPlayer):
+    """
+    StreamPlayer reading PCM from memory instead of ffmpeg.
+    """
+
+    def __init__(self, stats, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.process = FakeProcess(self, self.buff)
+        self.stats = stats
+        self.frames = 0
+        self.interrupted = False
+        send = self.player
+
+        def play_audio(data, **kwargs):
+            self.frames += 1
+            return send(data, **kwargs)
+        self.player = play_audio
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            if not self.interrupted:
+                # a crossfade plays the start of the song into the
+                # one before and starts it at an offset.
+                skipped = round(getattr(self, 'offset', 0) / self.delay)
+                with self.stats.lock:
+                    self.stats.songs.append(self.frames + skipped)
+
+    def stop(self):
+        # the player stops itself at the end of the song.
+        if threading.current_thread() is not self:
+            self.interrupted = True
+        super().stop()
+
+
+class FakeVoiceClient:
+    """
+    The parts of discord.VoiceClient the voice plugin uses.
+    """
+
+    def __init__(self, channel, pcm, stats, frame_length):
+        self.channel = channel
+        self.server = channel.server
+        self.pcm = pcm
+        self.stats = stats
+        self.encoder = FakeEncoder(frame_length)
+        self._connected = threading.Event()
+        self._connected.set()
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def play_audio(self, data, *, encode=True):
+        with self.stats.lock:
+            self.stats.frames += 1
+
+    def create_ffmpeg_player(self, filename, *, use_avconv=False,
+                             pipe=False, stderr=None, options=None,
+                             before_options=None, headers=None,
+                             after=None):
+        return FakePlayer(self.stats, io.BytesIO(self.pcm), self.encoder,
+                          self._connected, self.play_audio, after)
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self):
+        self._connected.clear()
+
+
+class FakeResolver:
+    """
+    Stands in for TrackResolver, every query is an song of the
+    synthetic PCM found after a fixed delay.
+    """
+
+    def __init__(self, duration, latency, limiter):
+        self.duration = duration
+        self.latency = latency
+        self.limiter = limiter
+        self.stats = {'requests': 0}
+
+    async def resolve(self, query, server_id=None, timeout=None):
+        self.stats['requests'] += 1
+        await self.limiter.acquire(server_id, timeout)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.limiter.release()
+        return {
+            'id': query, 'extractor_key': 'Fake', 'url': 'pcm',
+            'webpage_url': 'https://example.com/' + query,
+            'title': query, 'uploader': 'loadtest',
+            'duration': self.duration}
+
+    def format_stats(self):
+        return 'requests: {0}'.format(self.stats['requests'])
+
+    def close(self):
+        pass
+
+
+class Object:
+    """
+    Fake discord model, the attributes are given as keywords.
+    """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeBot:
+    """
+    The parts of DecoraterBot the voice plugin uses.
+    """
+
+    def __init__(self, loop, pcm, stats, frame_length):
+        self.loop = loop
+        self.pcm = pcm
+        self.stats = stats
+        self.frame_length = frame_length
+        self.ignoreslist = {'channels': []}
+        self.banlist = {'Users': []}
+        self.BotConfig = Object(discord_user_id='0')
+        self.BotPMError = Object(
+            resolve_send_message_error=self.resolve_send_message_error)
+        self.initial_rejoin_voice_channel = False
+
+    async def resolve_send_message_error(self, bot, ctx):
+        pass
+
+    async def join_voice_channel(self, channel):
+        # about what the voice websocket handshake takes.
+        await asyncio.sleep(0.05)
+        return FakeVoiceClient(channel, self.pcm, self.stats,
+                               self.frame_length)
+
+    async def send_message(self, destination, content=None, **kwargs):
+        self.stats.messages += 1
+
+    def get_channel(self, channel_id):
+        return None
+
+
+class LagMonitor:
+    """
+    Measures how late the event loop wakes up a sleeping task.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.lags = []
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(
+                time.perf_counter() - start - self.interval)
+
+
+class Server:
+    """
+    A simulated server with a text channel, a voice channel and a
+    member in it sending the commands.
+    """
+
+    def __init__(self, number):
+        server_id = str(100000 + number)
+        self.server = Object(id=server_id, name='server' + server_id)
+        self.text = Object(id=server_id + '1', name='text',
+                           server=self.server)
+        self.voice = Object(id=server_id + '2', name='voice',
+                            server=self.server)
+        self.author = Object(id=server_id + '3', voice_channel=self.voice)
+
+    def context(self, content):
+        message = Object(content='!' + content, channel=self.text,
+                         server=self.server, author=self.author)
+        return Object(message=message, prefix='!')
+
+
+async def run_command(cog, stats, command, ctx):
+    stats.commands += 1
+    await command.callback(cog, ctx)
+
+
+async def drive_server(cog, stats, server, songs, skips):
+    """
+    Joins, plays and queues songs, skips some of them, waits for the
+    rest to finish and leaves.
+    """
+    await run_command(cog, stats, voice.Voice.join_voice_channel_command,
+                      server.context('JoinVoiceChannel'))
+    for i in range(songs):
+        await run_command(
+            cog, stats, voice.Voice.play_command,
+            server.context('play song {0} {1}'.format(server.server.id, i)))
+    for i in range(skips):
+        await asyncio.sleep(0.1)
+        await run_command(cog, stats, voice.Voice.stop_command,
+                          server.context('stop'))
+    while True:
+        session = cog.get_session(server.server)
+        if session is None or (session.player is None and
+                               not session.starting):
+            break
+        await asyncio.sleep(0.1)
+    await run_command(cog, stats, voice.Voice.leave_voice_channel_command,
+                      server.context('LeaveVoiceChannel'))
+
+
+async def run(args, loop):
+    if args.pcm:
+        with open(args.pcm, 'rb') as pcm_file:
+            pcm = pcm_file.read()
+    else:
+        pcm = make_pcm(args.seconds)
+    frame_length = 20 / args.speed
+    duration = len(pcm) // FRAME_SIZE * frame_length / 1000
+    stats = Stats()
+    bot = FakeBot(loop, pcm, stats, frame_length)
+    # nothing the load test does may touch the real BotVoiceChannel.json.
+    voice.VoiceChannel.write_json = lambda self: None
+    cog = voice.Voice(bot)
+    cog.botvoicechannel = {}
+    cog.resolver.close()
+    cog.resolver = FakeResolver(duration, args.latency, cog.resolve_limiter)
+    monitor = LagMonitor()
+    monitor_task = loop.create_task(monitor.run())
+    servers = [Server(number) for number in range(args.servers)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        drive_server(cog, stats, server, args.songs, args.skips)
+        for server in servers])
+    took = time.perf_counter() - start
+    monitor_task.cancel()
+    # every song that was not skipped has to be played whole.
+    frames = len(pcm) // FRAME_SIZE
+    cut = [count for count in stats.songs if count != frames]
+    assert not cut, '{0} of {1} songs did not play {2} frames: {3}'.format(
+        len(cut), len(stats.songs), frames, sorted(set(cut)))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    lags = sorted(monitor.lags) or [0.0]
+    print('servers: {0}, songs each: {1}, skips each: {2}'.format(
+        args.servers, args.songs, args.skips))
+    print('took: {0:.2f}s, commands: {1} ({2:.1f}/s), frames: {3} '
+          '({4:.1f}/s), messages: {5}'.format(
+              took, stats.commands, stats.commands / took, stats.frames,
+              stats.frames / took, stats.messages))
+    print('loop lag avg: {0:.4f}s p99: {1:.4f}s max: {2:.4f}s'.format(
+        sum(lags) / len(lags), lags[int(len(lags) * 0.99)], lags[-1]))
+    print('memory traced peak: {0:.1f} MiB, max rss: {1:.1f} MiB'.format(
+        peak / 1048576,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    print(cog.metrics.format_stats(list(cog.voiceobjs.values())))
+    print(cog.supervisor.format_stats())
+    print(cog.player_limiter.format_stats('players'))
+    print(cog.resolve_limiter.format_stats('lookups'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--servers', type=int, default=200)
+    parser.add_argument('--songs', type=int, default=3,
+                        help='songs asked for in every server')
+    parser.add_argument('--skips', type=int, default=1,
+                        help='stop commands sent in every server')
+    parser.add_argument('--pcm', help='48 kHz 16 bit stereo raw PCM file '
+                                      'to play instead of a tone')
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='length of the generated tone')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='play the audio this many times faster')
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help='seconds every stub lookup takes')
+    parser.add_argument('--bot-dir', default=os.getcwd(),
+                        help='bot folder holding the resources folder')
+    args = parser.parse_args()
+    sys.path[0] = os.path.abspath(args.bot_dir)
+    cache_dir = tempfile.mkdtemp(prefix='voice_loadtest')
+    settings = voice.read_voice_settings()
+    # the fake players stand in for ffmpeg, and the caches and play
+    # history of the bot are left alone.
+    settings.update({
+        'cache_dir': cache_dir, 'audio_cache_bytes': 0,
+        'warm_ffmpeg': 0, 'voice_workers': 0, 'library_dir': '',
+        'sfx_dir': '', 'normalize_loudness': False, 'skip_silence': 0,
+        'play_history': False})
+    voice.read_voice_settings = lambda: dict(settings)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run(args, loop))
+    finally:
+        loop.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,318 @@
 """
 DecoraterBot's Voice Channel Plugin.
 """
+import asyncio
+import collections
+import concurrent.futures
+import ctypes.util
+import functools
+import hashlib
+import http.client
+import itertools
 import json
+import multiprocessing
+import queue
+import re
+import shlex
+import subprocess
 import sys
 import os
+import threading
+import time
+import urllib.request
 
 import youtube_dl
 import discord
 from discord.ext import commands
 from DecoraterBotUtils import BotErrors
 from DecoraterBotUtils.utils import *
+try:
+    import mutagen
+except ImportError:
+    mutagen = None
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# bytes in a second of the 48 kHz 16 bit stereo PCM discord.py sends.
+PCM_BYTES_PER_SECOND = 48000 * 2 * 2
+# defaults for the settings that can be changed in VoiceSettings.json.
+DEFAULT_VOICE_SETTINGS = {
+    # maximum number of songs in the playlist of a Voice Channel,
+    # 0 for no limit.
+    'max_queue_length': 100,
+    # threads used only for youtube_dl lookups.
+    'resolver_threads': 8,
+    # youtube_dl lookups a single server can have running at once.
+    'resolver_server_limit': 2,
+    # most songs a single play command can add, separated by | or
+    # new lines. They are looked up resolver_server_limit at a time,
+    # so 10 songs take about 5 lookup times with the defaults.
+    'max_batch_songs': 10,
+    # folder (relative to the bot folder) the voice caches are kept in.
+    'cache_dir': os.path.join('resources', 'Cache'),
+    # youtube_dl lookups kept in memory, 0 to disable the cache.
+    'info_cache_size': 1024,
+    # seconds a lookup is kept. Stream urls expire after a few hours
+    # so keep this well below that.
+    'info_cache_ttl': 3600,
+    # save the lookup cache to the cache folder when unloading.
+    'info_cache_persist': True,
+    # seconds before the end of a song to start opening the next
+    # one, 0 to only open it once the song ended.
+    'prefetch_seconds': 10,
+    # bytes of audio kept in the cache folder so songs played again
+    # do not have to be streamed, 0 to disable the audio cache.
+    'audio_cache_bytes': 0,
+    # songs longer than this many seconds are never saved.
+    'audio_cache_max_duration': 900,
+    # send the Opus audio of Opus sources as is instead of decoding
+    # it to PCM and encoding it again.
+    'opus_passthrough': True,
+    # Voice Channels rejoined at once on startup and reload.
+    'rejoin_concurrency': 4,
+    # seconds to wait for a single Voice Channel to be rejoined.
+    'rejoin_timeout': 30,
+    # seconds between saves of the playlists and song positions
+    # resumed after a reload.
+    'playlist_save_interval': 30,
+    # seconds to stay in a Voice Channel with nobody listening,
+    # 0 to never leave it.
+    'empty_timeout': 300,
+    # seconds to stay in a Voice Channel with nothing playing,
+    # 0 to never leave it.
+    'idle_timeout': 900,
+    # seconds between checks for Voice Channels to leave.
+    'reaper_interval': 30,
+    # encoding profiles the quality command can pick from. bitrate is
+    # in kbps, bandwidth is the Opus audio bandwidth, buffer is the
+    # ffmpeg input queue size in packets and fallback is the profile
+    # switched to when playback falls behind.
+    'encoding_profiles': {
+        'high': {'bitrate': 128, 'bandwidth': 'full', 'buffer': 512,
+                 'reconnect': True, 'passthrough': True,
+                 'fallback': 'normal'},
+        'normal': {'bitrate': 64, 'bandwidth': 'full', 'buffer': 512,
+                   'reconnect': True, 'passthrough': False,
+                   'fallback': 'low'},
+        'low': {'bitrate': 32, 'bandwidth': 'wide', 'buffer': 1024,
+                'reconnect': True, 'passthrough': False,
+                'fallback': None},
+    },
+    # profile of Voice Channels the quality command was not used in.
+    'encoding_profile': 'high',
+    # seconds a player may fall behind before switching to the
+    # fallback profile, 0 to never switch.
+    'step_down_lag': 2.0,
+    # seconds between checks of how far behind players are.
+    'lag_check_interval': 5,
+    # seconds of audio read from ffmpeg ahead of the player to ride
+    # out network hiccups, 0 to read it just in time.
+    'read_ahead_seconds': 5,
+    # worker processes running ffmpeg and the Opus encoding so they
+    # do not slow down the bot, 0 to do it all in the bot process.
+    # Needs numpy.
+    'voice_workers': 0,
+    # songs playing at once across every server, 0 for no limit.
+    'max_players': 50,
+    # youtube_dl lookups waiting or running at once across every
+    # server, 0 for no limit.
+    'max_pending_resolves': 32,
+    # seconds a command waits for a free player or lookup before
+    # telling the user the bot is too busy.
+    'admission_timeout': 30,
+    # ffmpeg processes kept started and waiting for their input so
+    # songs start faster, 0 to start one for every song.
+    'warm_ffmpeg': 2,
+    # folder of local music the play command searches before
+    # YouTube, empty to not use one.
+    'library_dir': '',
+    'library_extensions': ['.mp3', '.flac', '.ogg', '.opus', '.m4a',
+                           '.wav'],
+    # seconds between checks of the folder for changed files.
+    'library_rescan_interval': 600,
+    # seconds the end of a song is mixed with the start of the next
+    # one, 0 for hard cuts. Needs numpy.
+    'crossfade_seconds': 3,
+    # folder of short sound effects the sfx command mixes over the
+    # music, empty to not use one. Needs numpy.
+    'sfx_dir': '',
+    # longer sound effects are cut off.
+    'sfx_max_seconds': 10,
+    # measure the loudness of songs once in the background and bring
+    # them to loudness_target dB (mean volume) from then on. A song
+    # that needs a gain is decoded, so it is no longer sent with
+    # opus_passthrough.
+    'normalize_loudness': False,
+    'loudness_target': -18.0,
+    # songs are never made louder than this many dB.
+    'loudness_max_gain': 12.0,
+    # silence at the start and end of a song longer than this many
+    # seconds is skipped, 0 to play it. Songs trimmed this way are
+    # not sent with opus_passthrough either.
+    'skip_silence': 0,
+    'loudness_cache_size': 10000,
+    'loudness_threads': 1,
+    # keep a history of the songs played in every server.
+    'play_history': True,
+    # most played songs of every server looked up (and downloaded
+    # when the audio cache is on) when the bot starts.
+    'history_prewarm': 5,
+}
+
+
+def read_voice_settings():
+    """
+    Reads the Voice Settings, falling back to the defaults
+    for those not set in VoiceSettings.json.
+    """
+    settings = dict(DEFAULT_VOICE_SETTINGS)
+    file_name = os.path.join(
+        sys.path[0], 'resources', 'ConfigData',
+        'VoiceSettings.json')
+    try:
+        with open(file_name) as settings_file:
+            settings.update(json.load(settings_file))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def get_voice_channel_file():
+    """
+    Gets the path of BotVoiceChannel.json.
+    """
+    return os.path.join(sys.path[0], 'resources', 'ConfigData',
+                        'BotVoiceChannel.json')
+
+
+def reap_player(player):
+    """
+    Kills the ffmpeg process of a player that will never be started.
+    """
+    process = getattr(player, 'process', None)
+    if process is not None:
+        stop_read_ahead(process)
+    if process is not None and process.poll() is None:
+        process.kill()
+        process.communicate()
+
+
+def stop_read_ahead(process):
+    """
+    Stops the ReadAheadBuffer reading the output of a process, if it
+    has one, so its thread does not wait for a player that is gone.
+    """
+    buffer = getattr(process, 'read_ahead', None)
+    if buffer is not None:
+        buffer.stop()
+
+
+def get_player_lag(player):
+    """
+    Gets how many seconds a playing player is behind of where it
+    should be, it falls behind when ffmpeg can not keep up.
+    """
+    start = getattr(player, '_start', None)
+    if start is None or not player.is_playing():
+        return 0.0
+    return max(0.0, time.time() - start - player.loops * player.delay)
+
+
+def get_player_elapsed(player):
+    """
+    Gets how far into its song a player is in seconds, counting
+    the part skipped when it was resumed from an offset.
+    """
+    return getattr(player, 'offset', 0) + \
+        getattr(player, 'loops', 0) * player.delay
+
+
+def pause_player(player):
+    """
+    Pauses a player. Resuming it counts its frames from 0 again, so
+    how far it got is added to its offset first.
+    """
+    player.pause()
+    player.offset = get_player_elapsed(player)
+    player.loops = 0
+
+
+def opus_packet_duration(packet):
+    """
+    Gets the duration in seconds of an Opus packet from its TOC byte.
+    """
+    toc = packet[0]
+    config = toc >> 3
+    if config < 12:
+        frame_size = (0.01, 0.02, 0.04, 0.06)[config % 4]
+    elif config < 16:
+        frame_size = (0.01, 0.02)[config % 2]
+    else:
+        frame_size = (0.0025, 0.005, 0.01, 0.02)[config % 4]
+    code = toc & 3
+    if code == 0:
+        frames = 1
+    elif code < 3:
+        frames = 2
+    else:
+        frames = packet[1] & 0x3F if len(packet) > 1 else 1
+    return frame_size * frames
+
+
+def split_duration(duration):
+    """
+    Splits an duration in seconds into the minutes and
+    seconds strings used in the voice messages.
+    """
+    fulldir = duration or 0
+    minutes = str(int((fulldir / 60) % 60))
+    seconds = str(int(fulldir % 60))
+    if len(seconds) == 1:
+        seconds = "0" + seconds
+    return minutes, seconds
+
+
+def get_cache_path(settings, *parts):
+    """
+    Gets an path in the voice cache folder, making the folder
+    if needed.
+    """
+    folder = os.path.join(sys.path[0], settings['cache_dir'])
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, *parts)
+
+
+def normalize_query(query):
+    """
+    Normalizes an search string or url so the same song
+    asked for in slightly different ways has the same key.
+    """
+    query = ' '.join(query.split())
+    if query.startswith('http://') or query.startswith('https://'):
+        return query
+    return query.lower()
+
+
+def is_playlist_url(url):
+    """
+    Checks if an url is for a whole YouTube playlist.
+    """
+    return 'youtube.com/playlist?' in url and 'list=' in url
+
+
+def count_listeners(channel):
+    """
+    Counts the members that are not bots in a Voice Channel.
+
+    :return: The count, or None when the members are not known.
+    """
+    members = getattr(channel, 'voice_members', None)
+    if members is None:
+        return None
+    return sum(1 for member in members if not member.bot)
 
 
 def make_voice_info(server_id, textchannel_id,
@@ -27,1735 +330,3511 @@ def make_voice_info(server_id, textchannel_id,
     return voicechannelobj, textchannelobj
 
 
-class VoiceChannel:
-    """
-    Class that should hopefully catch states
-    for all voice channels the bot joins in on.
-    """
-    def __init__(self, bot, botvoicechannel,
-                 voicechannelobj, textchannelobj):
+class OggOpusReader:
+    """
+    Reads the Opus packets out of an Ogg stream.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._packets = collections.deque()
+        self._partial = b''
+
+    def _read_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.stream.read(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _read_page(self):
+        """
+        Reads an Ogg page and splits it into packets.
+
+        :return: False at the end of the stream.
+        """
+        header = self._read_exact(27)
+        if header is None or header[:4] != b'OggS':
+            return False
+        lacing_values = self._read_exact(header[26])
+        if lacing_values is None:
+            return False
+        body = self._read_exact(sum(lacing_values))
+        if body is None:
+            return False
+        offset = 0
+        for lacing in lacing_values:
+            self._partial += body[offset:offset + lacing]
+            offset += lacing
+            # a lacing value of 255 means the packet goes on in the
+            # next segment, which can be on the next page.
+            if lacing < 255:
+                self._packets.append(self._partial)
+                self._partial = b''
+        return True
+
+    def read_packet(self):
+        """
+        Gets the next audio packet, skipping the Opus headers.
+
+        :return: The packet or None at the end of the stream.
+        """
+        while True:
+            while not self._packets:
+                if not self._read_page():
+                    return None
+            packet = self._packets.popleft()
+            if packet and not packet.startswith(b'OpusHead') and \
+                    not packet.startswith(b'OpusTags'):
+                return packet
+
+
+class ReadAheadBuffer:
+    """
+    Fixed size ring buffer a thread fills from the output of ffmpeg
+    ahead of the player. The thread reads straight into the buffer
+    so filling it does not allocate anything.
+
+    It has the read method players use on the ffmpeg output.
+    """
+    # bytes the thread reads at once so the player can use the first
+    # part of the output before the buffer is full.
+    chunk_size = 65536
+
+    def __init__(self, stream, process, size, on_underrun=None):
+        self.stream = stream
+        self.process = process
+        self.size = max(size, self.chunk_size * 2)
+        self.buffer = bytearray(self.size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.length = 0
+        self.eof = False
+        self.stopped = False
+        self.started = False
+        self.underruns = 0
+        self.on_underrun = on_underrun
+        self.condition = threading.Condition()
+        # so stop_read_ahead finds it from the process.
+        process.read_ahead = self
+        self.thread = threading.Thread(target=self._fill, daemon=True)
+        self.thread.start()
+
+    def _fill(self):
+        readinto = getattr(self.stream, 'readinto1', self.stream.readinto)
+        try:
+            while True:
+                with self.condition:
+                    while self.length == self.size:
+                        # ffmpeg can exit with output left in the
+                        # pipe, so only a stopped player ends it.
+                        if self.stopped:
+                            return
+                        self.condition.wait()
+                    end = (self.start + self.length) % self.size
+                    count = min(self.size - self.length,
+                                self.size - end, self.chunk_size)
+                # only this thread writes to the free part of the buffer
+                # so it is read into without holding the lock.
+                read = readinto(self.view[end:end + count])
+                if not read:
+                    return
+                with self.condition:
+                    self.length += read
+                    self.condition.notify_all()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.condition:
+                self.eof = True
+                self.condition.notify_all()
+
+    def read(self, count):
+        """
+        Reads count bytes, waiting for them if they were not read
+        from ffmpeg yet. Less are returned only at the end.
+        """
+        with self.condition:
+            if self.length < count and not self.eof:
+                if self.started:
+                    self.underruns += 1
+                    if self.on_underrun is not None:
+                        self.on_underrun()
+                while self.length < count and not self.eof:
+                    self.condition.wait()
+            self.started = True
+            count = min(count, self.length)
+            start = self.start
+            end = start + count
+            if end <= self.size:
+                data = bytes(self.view[start:end])
+            else:
+                data = bytes(self.view[start:]) + bytes(
+                    self.view[:end - self.size])
+            self.start = end % self.size
+            self.length -= count
+            self.condition.notify_all()
+        return data
+
+    def stop(self):
+        """
+        Stops filling the buffer, the player will not read it again.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+
+class PCMMixer:
+    """
+    Stands in for the stream a player reads its PCM from, applies
+    its gain and mixes the start of the next song and sound effects
+    into it. The mixing is done on whole frames with numpy so it
+    costs microseconds.
+    """
+
+    def __init__(self, source, gain=1.0):
+        self.source = source
+        # volume times the loudness normalization of the song.
+        self.gain = gain
+        self.lock = threading.Lock()
+        # [samples, position] of the sound effects playing.
+        self.clips = []
+        # [source, samples, position] of the song faded in.
+        self.fade = None
+        # samples of it mixed, kept when the fade ends.
+        self.faded = 0
+
+    def add_clip(self, samples):
+        """
+        Mixes an int16 numpy array of PCM in from the next frame.
+        """
+        with self.lock:
+            self.clips.append([samples, 0])
+
+    def crossfade(self, source, frames, gain=1.0):
+        """
+        Fades the song out and the PCM of source in over frames.
+
+        :param gain: gain of the song faded in.
+        """
+        with self.lock:
+            self.fade = [source, frames * 1920, 0, gain]
+            self.faded = 0
+
+    @property
+    def faded_frames(self):
+        """
+        Frames of the song faded in that were mixed so far.
+        """
+        with self.lock:
+            return self.faded // 1920
+
+    def read(self, count):
+        data = self.source.read(count)
+        with self.lock:
+            if not self.clips and self.fade is None and self.gain == 1.0:
+                return data
+            mix = numpy.frombuffer(
+                data[:len(data) // 2 * 2], dtype=numpy.int16).astype(
+                numpy.float32)
+            if self.gain != 1.0:
+                mix *= self.gain
+            size = len(mix)
+            if self.fade is not None and len(data) == count:
+                source, length, position, gain = self.fade
+                other = source.read(count)
+                if len(other) == count:
+                    ramp = numpy.minimum(numpy.arange(
+                        position, position + size,
+                        dtype=numpy.float32) / length, 1.0)
+                    mix *= 1.0 - ramp
+                    mix += ramp * gain * numpy.frombuffer(
+                        other, dtype=numpy.int16)
+                    self.fade[2] += size
+                    self.faded += size
+                else:
+                    # the next song ended or was dropped.
+                    self.fade = None
+            for clip in self.clips:
+                samples, position = clip
+                part = samples[position:position + size]
+                mix[:len(part)] += part
+                clip[1] += size
+            self.clips = [clip for clip in self.clips
+                          if clip[1] < len(clip[0])]
+        numpy.clip(mix, -32768, 32767, out=mix)
+        return mix.astype(numpy.int16).tobytes()
+
+
+class OpusPassthroughPlayer(discord.voice_client.ProcessPlayer):
+    """
+    Player that sends the Opus packets ffmpeg copies out of an Opus
+    source as is, so nothing is decoded or encoded again.
+    """
+    passthrough = True
+
+    def __init__(self, process, client, after, **kwargs):
+        super().__init__(process, client, after, **kwargs)
+        self.packets = OggOpusReader(process.stdout)
+
+    def _do_run(self):
+        self.loops = 0
+        self._start = time.time()
+        elapsed = 0.0
+        while not self._end.is_set():
+            # are we paused?
+            if not self._resumed.is_set():
+                # wait until we aren't
+                self._resumed.wait()
+                elapsed = 0.0
+
+            if not self._connected.is_set():
+                self.stop()
+                break
+
+            packet = self.packets.read_packet()
+            if packet is None:
+                self.stop()
+                break
+
+            self.player(packet, encode=False)
+            elapsed += opus_packet_duration(packet)
+            self.loops = int(round(elapsed / self.delay))
+            next_time = self._start + elapsed
+            time.sleep(max(0, next_time - time.time()))
+
+
+class WorkerPlayer(OpusPassthroughPlayer):
+    """
+    Player that sends the Opus packets a voice worker process
+    encoded.
+    """
+    worker = True
+    # the worker encodes the audio, so the volume and bitrate apply.
+    passthrough = False
+
+    def __init__(self, stream, client, after, **kwargs):
+        super().__init__(stream, client, after, **kwargs)
+        self.packets = stream
+
+
+def run_voice_worker(connection, opus_library):
+    """
+    Main function of a voice worker process. Runs ffmpeg for the songs
+    handed to it and sends back their audio as Opus packets.
+
+    Messages from the bot process are ('play', id, args, volume,
+    bitrate, packets ahead), ('ack', id, count) after the player used
+    count packets, ('volume', id, volume), ('bitrate', id, bitrate),
+    ('stop', id) and None to exit. The worker sends (id, packet) and
+    (id, None) when an song ended.
+    """
+    if not discord.opus.is_loaded() and opus_library:
+        discord.opus.load_opus(opus_library)
+    lock = threading.Lock()
+    streams = {}
+
+    def send(message):
+        with lock:
+            connection.send(message)
+
+    def encode(stream_id, process, credits, stopped, settings):
+        try:
+            encoder = discord.opus.Encoder(48000, 2)
+            bitrate = None
+            while True:
+                data = process.stdout.read(encoder.frame_size)
+                if len(data) != encoder.frame_size:
+                    break
+                # the volume and bitrate can change while it plays.
+                volume = settings[0]
+                if settings[1] != bitrate:
+                    bitrate = settings[1]
+                    encoder.set_bitrate(bitrate)
+                if volume != 1.0:
+                    samples = numpy.frombuffer(
+                        data, dtype=numpy.int16).astype(numpy.float32)
+                    samples *= min(volume, 2.0)
+                    numpy.clip(samples, -32768, 32767, out=samples)
+                    data = samples.astype(numpy.int16).tobytes()
+                # only send what the player will use soon.
+                credits.acquire()
+                if stopped.is_set():
+                    break
+                send((stream_id, encoder.encode(
+                    data, encoder.samples_per_frame)))
+        except Exception as e:
+            str(e)
+        finally:
+            streams.pop(stream_id, None)
+            ProcessSupervisor.kill(process)
+            try:
+                send((stream_id, None))
+            except OSError:
+                pass
+
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            elif message[0] == 'play':
+                stream_id, args, volume, bitrate, ahead = message[1:]
+                try:
+                    process = subprocess.Popen(
+                        args, stdin=subprocess.DEVNULL,
+                        stdout=subprocess.PIPE)
+                except OSError:
+                    send((stream_id, None))
+                    continue
+                credits = threading.Semaphore(ahead)
+                stopped = threading.Event()
+                settings = [volume, bitrate]
+                streams[stream_id] = (process, credits, stopped, settings)
+                threading.Thread(
+                    target=encode, daemon=True, args=(
+                        stream_id, process, credits, stopped,
+                        settings)).start()
+            elif message[1] in streams:
+                process, credits, stopped, settings = streams[message[1]]
+                if message[0] == 'ack':
+                    for _ in range(message[2]):
+                        credits.release()
+                elif message[0] == 'volume':
+                    settings[0] = message[2]
+                elif message[0] == 'bitrate':
+                    settings[1] = message[2]
+                elif message[0] == 'stop':
+                    stopped.set()
+                    process.kill()
+                    credits.release()
+    except (EOFError, OSError):
+        pass
+    finally:
+        for process, credits, stopped, _ in list(streams.values()):
+            stopped.set()
+            process.kill()
+            credits.release()
+
+
+class WorkerStream:
+    """
+    Audio of an song a voice worker process is encoding, read as
+    Opus packets. It has the parts of Popen the players and the
+    ProcessSupervisor use so it can stand in for ffmpeg.
+    """
+    stdout = None
+    # packets used before the worker is told to send more.
+    ack_every = 50
+
+    def __init__(self, worker, stream_id):
+        self.worker = worker
+        self.stream_id = stream_id
+        self.packets = queue.Queue()
+        self.returncode = None
+        self.unacked = 0
+
+    def read_packet(self):
+        """
+        Gets the next Opus packet.
+
+        :return: The packet, None at the end of the song.
+        """
+        if self.returncode is not None:
+            return None
+        packet = self.packets.get()
+        if packet is None:
+            if self.returncode is None:
+                self.returncode = 0
+            return None
+        self.unacked += 1
+        if self.unacked >= self.ack_every:
+            self.worker.send(('ack', self.stream_id, self.unacked))
+            self.unacked = 0
+        return packet
+
+    def set_volume(self, volume):
+        """
+        Changes the volume the worker plays the song at.
+        """
+        if self.returncode is None:
+            self.worker.send(('volume', self.stream_id, volume))
+
+    def set_bitrate(self, bitrate):
+        """
+        Changes the bitrate the worker encodes the song at.
+        """
+        if self.returncode is None:
+            self.worker.send(('bitrate', self.stream_id, bitrate))
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:
+            self.returncode = -9
+            self.worker.send(('stop', self.stream_id))
+            self.packets.put(None)
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def communicate(self):
+        return None, None
+
+
+class VoiceWorker:
+    """
+    Voice worker process and the thread handing the packets it sends
+    to the WorkerStreams they are for.
+    """
+
+    def __init__(self, opus_library):
+        # a forked child would get a copy of the threads and the event
+        # loop of the bot in whatever state they are in.
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=run_voice_worker, daemon=True,
+            args=(child_connection, opus_library))
+        self.process.start()
+        child_connection.close()
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.alive = True
+        self.thread = threading.Thread(target=self._receive, daemon=True)
+        self.thread.start()
+
+    def _receive(self):
+        try:
+            while True:
+                stream_id, packet = self.connection.recv()
+                stream = self.streams.get(stream_id)
+                if stream is None:
+                    continue
+                stream.packets.put(packet)
+                if packet is None:
+                    self.streams.pop(stream_id, None)
+        except (EOFError, OSError):
+            pass
+        # the worker died, end the songs it was encoding.
+        self.alive = False
+        for stream in list(self.streams.values()):
+            stream.packets.put(None)
+        self.streams.clear()
+
+    def send(self, message):
+        try:
+            with self.lock:
+                self.connection.send(message)
+        except (OSError, ValueError):
+            pass
+
+    def open(self, stream_id, args, volume, bitrate, ahead):
+        """
+        Starts encoding an song.
+
+        :return: WorkerStream to read it from.
+        """
+        stream = WorkerStream(self, stream_id)
+        self.streams[stream_id] = stream
+        self.send(('play', stream_id, args, volume, bitrate, ahead))
+        return stream
+
+    def close(self):
+        self.send(None)
+        self.connection.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class VoiceWorkerPool:
+    """
+    Worker processes the songs are encoded in, each song goes to the
+    one encoding the least songs.
+    """
+
+    def __init__(self, count, opus_library=None):
+        if opus_library is None:
+            opus_library = ctypes.util.find_library('opus')
+        self.workers = [VoiceWorker(opus_library) for _ in range(count)]
+        self.stream_ids = itertools.count()
+
+    def open(self, args, volume=1.0, bitrate=128, ahead=250):
+        """
+        Starts encoding an song in the least loaded worker.
+
+        :return: WorkerStream or None when every worker died.
+        """
+        workers = [worker for worker in self.workers if worker.alive]
+        if not workers:
+            return None
+        worker = min(workers, key=lambda worker: len(worker.streams))
+        return worker.open(next(self.stream_ids), args, volume, bitrate,
+                           ahead)
+
+    def format_stats(self):
+        """
+        Formats the worker loads for the voicestats command.
+        """
+        return 'workers: {0}'.format(', '.join(
+            str(len(worker.streams)) if worker.alive else 'dead'
+            for worker in self.workers))
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+class Track:
+    """
+    A song in the playlist of a Voice Channel.
+
+    Only the info needed to show and later play the song is kept,
+    the player for it is created when it reaches the front of
+    the playlist.
+    """
+    __slots__ = ('key', 'url', 'title', 'uploader', 'duration')
+
+    def __init__(self, key, url, title, uploader, duration):
+        """
+        :param key: canonical id of the song (extractor:id).
+        :param url: url youtube_dl can resolve the song from again.
+        """
+        self.key = key
+        self.url = url
+        self.title = title
+        self.uploader = uploader
+        self.duration = duration
+
+    def dump(self):
+        """
+        Gets the song as a list that can be saved as json.
+        """
+        return [self.key, self.url, self.title, self.uploader,
+                self.duration]
+
+    @classmethod
+    def load(cls, data):
+        """
+        Makes an Track from the list made by dump.
+        """
+        return cls(*data)
+
+    @classmethod
+    def from_entry(cls, entry):
+        """
+        Makes an Track from a flat playlist entry without resolving it.
+
+        :return: Track or None if the entry has no id.
+        """
+        media_id = entry.get('id') or entry.get('url')
+        if not media_id:
+            return None
+        url = entry.get('url', media_id)
+        if not url.startswith('http'):
+            url = 'https://www.youtube.com/watch?v=' + media_id
+        key = '{0}:{1}'.format(
+            entry.get('ie_key', 'Youtube').lower(), media_id)
+        return cls(key, url, entry.get('title') or url,
+                   entry.get('uploader'), entry.get('duration'))
+
+    @classmethod
+    def from_info(cls, info):
+        """
+        Makes an Track from a youtube_dl info dict.
+        """
+        url = info.get('webpage_url') or info['url']
+        media_id = info.get('id')
+        if media_id is None:
+            key = url
+        else:
+            key = '{0}:{1}'.format(
+                info.get('extractor_key', 'generic').lower(), media_id)
+        return cls(key, url, info.get('title'),
+                   info.get('uploader'), info.get('duration'))
+
+
+class TrackQueue:
+    """
+    Playlist of a Voice Channel.
+
+    Songs are kept in a deque with a dict index on their key so
+    enqueue, dequeue and duplicate checks are all O(1).
+    """
+    def __init__(self, maxlen=0):
+        """
+        :param maxlen: maximum number of songs, 0 for no limit.
+        """
+        self.maxlen = maxlen
+        self._tracks = collections.deque()
+        self._index = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._tracks)
+
+    def full(self):
+        """
+        Checks if no more songs can be added.
+        """
+        return 0 < self.maxlen <= len(self._index)
+
+    def put(self, track):
+        """
+        Adds an song to the end of the playlist.
+
+        :return: False if the song is already in the
+            playlist or the playlist is full.
+        """
+        if track.key in self._index or self.full():
+            return False
+        self._tracks.append(track)
+        self._index[track.key] = track
+        return True
+
+    def get(self):
+        """
+        Removes and returns the first song in the playlist.
+
+        :return: Track or None if the playlist is empty.
+        """
+        if not self._tracks:
+            return None
+        track = self._tracks.popleft()
+        del self._index[track.key]
+        return track
+
+    def first(self):
+        """
+        Gets the first song in the playlist without removing it.
+
+        :return: Track or None if the playlist is empty.
+        """
+        return self._tracks[0] if self._tracks else None
+
+    def peek(self, count):
+        """
+        Gets up to count songs from the start of the playlist.
+        """
+        tracks = []
+        for track in self:
+            if len(tracks) == count:
+                break
+            tracks.append(track)
+        return tracks
+
+    def clear(self):
+        """
+        Removes all songs from the playlist.
+        """
+        self._tracks.clear()
+        self._index.clear()
+
+
+class InfoCache:
+    """
+    Memory bounded cache of youtube_dl info dicts.
+
+    Entries are keyed by the canonical id of the song with the
+    normalized search strings and urls that resolved to it as
+    aliases. The least recently used entries are dropped once
+    the cache is full and entries expire after ttl seconds.
+    """
+    # the only parts of an info dict this cog uses.
+    fields = ('id', 'extractor_key', 'webpage_url', 'url', 'title',
+              'uploader', 'duration', 'is_live', 'http_headers',
+              'view_count', 'like_count', 'dislike_count', 'ext',
+              'acodec', 'abr', 'asr')
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._aliases = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def get_key(info):
+        """
+        Gets the canonical id of an info dict.
+        """
+        return Track.from_info(info).key
+
+    def get(self, query):
+        """
+        Gets the cached info dict for an search string, url
+        or canonical id.
+
+        :return: info dict or None.
+        """
+        query = normalize_query(query)
+        key = self._aliases.get(query, query)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, query, info):
+        """
+        Caches an info dict under its canonical id, the query
+        it was resolved from and its page url.
+        """
+        if self.maxsize <= 0:
+            return
+        info = {name: info[name] for name in self.fields if name in info}
+        key = self.get_key(info)
+        self._entries[key] = (time.time() + self.ttl, info)
+        self._entries.move_to_end(key)
+        for alias in (query, info.get('webpage_url')):
+            if alias:
+                self._aliases[normalize_query(alias)] = key
+                self._aliases.move_to_end(normalize_query(alias))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        # each entry has about two aliases.
+        while len(self._aliases) > self.maxsize * 4:
+            self._aliases.popitem(last=False)
+
+    def load(self, file_name):
+        """
+        Loads the entries saved by save that did not expire yet.
+        """
+        try:
+            with open(file_name) as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, (expires, info) in data.get('entries', []):
+            if expires > now:
+                self._entries[key] = (expires, info)
+        for alias, key in data.get('aliases', []):
+            if key in self._entries:
+                self._aliases[alias] = key
+
+    def save(self, file_name):
+        """
+        Saves the entries to a file so they survive a reload.
+        """
+        data = {
+            'entries': [[key, list(entry)]
+                        for key, entry in self._entries.items()],
+            'aliases': list(self._aliases.items()),
+        }
+        with open(file_name, 'w') as cache_file:
+            json.dump(data, cache_file)
+
+
+class AudioCache:
+    """
+    Size bounded on disk cache of the audio of songs.
+
+    Each song is saved once under the sha1 of its canonical id.
+    When the cache goes over its byte budget the least recently
+    played songs are deleted.
+    """
+    def __init__(self, folder, max_bytes, ytdl_options, max_duration=900):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_duration = max_duration
+        self.ytdl_options = ytdl_options
+        self.index_file = os.path.join(folder, 'index.json')
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1)
+        self._lock = threading.Lock()
+        self._downloading = set()
+        self.index = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @property
+    def enabled(self):
+        """
+        Checks if songs are cached at all.
+        """
+        return self.max_bytes > 0
+
+    @property
+    def size(self):
+        """
+        Bytes used by the cached songs.
+        """
+        # the download thread adds and evicts songs meanwhile.
+        with self._lock:
+            return sum(entry['size'] for entry in self.index.values())
+
+    @staticmethod
+    def get_name(key):
+        """
+        Gets the file name (without extension) of an song.
+        """
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def load(self):
+        """
+        Loads the index, dropping songs whose files are gone.
+        """
+        try:
+            with open(self.index_file) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = {}
+        self.index = {
+            key: entry for key, entry in index.items()
+            if os.path.isfile(os.path.join(self.folder, entry['file']))}
+
+    def save(self):
+        """
+        Saves the index.
+        """
+        with self._lock:
+            data = dict(self.index)
+        with open(self.index_file, 'w') as index_file:
+            json.dump(data, index_file)
+
+    def get(self, key):
+        """
+        Gets the path of an cached song.
+
+        :return: The path or None if the song is not cached.
+        """
+        entry = self.index.get(key) if self.enabled else None
+        if entry is None:
+            self.misses += 1
+            return None
+        path = os.path.join(self.folder, entry['file'])
+        if not os.path.isfile(path):
+            with self._lock:
+                self.index.pop(key, None)
+            self.misses += 1
+            return None
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self.hits += 1
+        return path
+
+    def is_downloading(self, key):
+        """
+        Checks if an song is being saved to the cache.
+        """
+        return key in self._downloading
+
+    def get_info(self, key):
+        """
+        Gets the codec info saved for an cached song.
+        """
+        entry = self.index.get(key, {})
+        return {'acodec': entry.get('acodec'), 'asr': entry.get('asr')}
+
+    def schedule(self, loop, track):
+        """
+        Saves an song in the background if it is not cached yet.
+        """
+        if not self.enabled or track.key in self.index or \
+                track.key in self._downloading:
+            return
+        if not track.duration or track.duration > self.max_duration:
+            return
+        self._downloading.add(track.key)
+        future = loop.run_in_executor(
+            self.executor, self._download, track.key, track.url)
+        future.add_done_callback(
+            lambda fut: self._downloading.discard(track.key))
+
+    def _download(self, key, url):
+        """
+        Downloads an song into the cache. This blocks so it
+        runs on the cache's own thread.
+        """
+        name = self.get_name(key)
+        options = dict(self.ytdl_options)
+        options['outtmpl'] = os.path.join(
+            self.folder, name + '.part.%(ext)s')
+        options['noplaylist'] = True
+        try:
+            info = youtube_dl.YoutubeDL(options).extract_info(url)
+        except youtube_dl.utils.DownloadError:
+            return
+        ext = info.get('ext', 'webm')
+        part = os.path.join(self.folder, name + '.part.' + ext)
+        file_name = name + '.' + ext
+        try:
+            os.replace(part, os.path.join(self.folder, file_name))
+            size = os.path.getsize(os.path.join(self.folder, file_name))
+        except OSError:
+            return
+        with self._lock:
+            self.index[key] = {'file': file_name, 'size': size,
+                               'last_used': time.time(), 'hits': 0,
+                               'acodec': info.get('acodec'),
+                               'asr': info.get('asr')}
+        self.evict()
+        self.save()
+
+    def evict(self):
+        """
+        Deletes the least recently played songs until the
+        cache fits in its byte budget.
+        """
+        with self._lock:
+            entries = sorted(self.index.items(),
+                             key=lambda item: item[1]['last_used'])
+            size = sum(entry['size'] for key, entry in entries)
+            for key, entry in entries:
+                if size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.folder, entry['file']))
+                except OSError:
+                    pass
+                del self.index[key]
+                size -= entry['size']
+
+    def format_stats(self):
+        """
+        Formats the cache counters for the resolverstats command.
+        """
+        return (
+            'audio cache: {0} songs, {1} bytes, {2} hits, {3} misses'
+        ).format(len(self.index), self.size, self.hits, self.misses)
+
+    def close(self):
+        """
+        Stops the download thread once the running download finishes.
+        """
+        self.executor.shutdown(wait=False)
+
+
+class LoudnessCache:
+    """
+    Loudness and silence at the start and end of songs keyed by their
+    canonical id.
+
+    Each song is measured once by decoding it with ffmpeg on the
+    cache's own threads, so it is known from the next time it plays.
+    """
+
+    def __init__(self, file_name, maxsize=10000, silence=1.0,
+                 max_duration=900, max_workers=1):
+        self.file_name = file_name
+        self.maxsize = maxsize
+        self.silence = silence
+        self.max_duration = max_duration
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers)
+        self._analyzing = set()
+        # key -> [mean dB, peak dB, seconds the sound starts at,
+        # seconds it ends at or None].
+        self.entries = collections.OrderedDict()
+        self.failed = 0
+        self.load()
+
+    def get(self, key):
+        """
+        Gets what was measured for an song.
+
+        :return: The entry or None if it was not measured yet.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def schedule(self, loop, track, source, headers=None):
+        """
+        Measures an song in the background if it was not yet.
+        """
+        if track.key in self.entries or track.key in self._analyzing:
+            return
+        if not track.duration or track.duration > self.max_duration:
+            return
+        self._analyzing.add(track.key)
+        future = loop.run_in_executor(
+            self.executor, self.analyze, source, headers, track.duration)
+        future.add_done_callback(
+            functools.partial(self._analyzed, track.key))
+
+    def _analyzed(self, key, future):
+        self._analyzing.discard(key)
+        if future.cancelled() or future.exception() is not None or \
+                future.result() is None:
+            self.failed += 1
+            return
+        self.entries[key] = future.result()
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def analyze(self, source, headers, duration):
+        """
+        Decodes an song with ffmpeg and parses what its volumedetect
+        and silencedetect filters print. This blocks so it runs on
+        the cache's own threads.
+
+        :return: The entry or None if ffmpeg failed.
+        """
+        filters = 'volumedetect'
+        if self.silence > 0:
+            filters = 'silencedetect=n=-50dB:d={0},{1}'.format(
+                self.silence, filters)
+        args = ['ffmpeg', '-hide_banner', '-nostats']
+        if isinstance(headers, dict):
+            args.extend(['-headers', ''.join(
+                '{0}: {1}\r\n'.format(key, value)
+                for key, value in headers.items())])
+        args.extend(['-i', source, '-vn', '-af', filters, '-f', 'null',
+                     '-'])
+        try:
+            output = subprocess.run(
+                args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE, timeout=max(60, duration)).stderr
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        output = output.decode('utf-8', 'replace')
+        mean = re.search(r'mean_volume: (-?[\d.]+) dB', output)
+        peak = re.search(r'max_volume: (-?[\d.]+) dB', output)
+        if mean is None or peak is None:
+            return None
+        start, end = 0.0, None
+        silences = re.findall(
+            r'silence_(start|end): (-?[\d.]+)', output)
+        if silences and silences[0][0] == 'start' and \
+                float(silences[0][1]) <= 0.1 and len(silences) > 1:
+            start = float(silences[1][1])
+        if silences and silences[-1][0] == 'start':
+            # some ffmpeg versions do not end a silence at the end.
+            end = float(silences[-1][1])
+        elif len(silences) > 1 and float(silences[-1][1]) >= duration - 1:
+            end = float(silences[-2][1])
+        if end is not None and end <= start:
+            end = None
+        return [float(mean.group(1)), float(peak.group(1)), start, end]
+
+    def load(self):
+        """
+        Loads the entries saved by save.
+        """
+        try:
+            with open(self.file_name) as cache_file:
+                self.entries.update(json.load(cache_file))
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """
+        Saves the entries so songs are not measured again.
+        """
+        with open(self.file_name, 'w') as cache_file:
+            json.dump(list(self.entries.items()), cache_file)
+
+    def format_stats(self):
+        """
+        Formats the cache counters for the resolverstats command.
+        """
+        return 'loudness cache: {0} songs, {1} measuring, {2} failed'.format(
+            len(self.entries), len(self._analyzing), self.failed)
+
+    def close(self):
+        """
+        Stops the threads once the running measurements finish.
+        """
+        self.executor.shutdown(wait=False)
+
+
+class PlayHistory:
+    """
+    History of the songs played in every server.
+
+    Each server has a file in folder a line is appended to for every
+    song played. Once it has many more lines than songs it is
+    compacted into one line per song holding its play count.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        # server id -> {key: [last played, play count, dumped Track]}.
+        self._servers = {}
+        # server id -> lines in its file.
+        self._lines = {}
+
+    def get_file(self, server_id):
+        """
+        Gets the path of the history file of a server.
+        """
+        return os.path.join(self.folder, '{0}.jsonl'.format(server_id))
+
+    def servers(self):
+        """
+        Gets the ids of the servers that have a history.
+        """
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return []
+        return [name[:-6] for name in names if name.endswith('.jsonl')]
+
+    def load(self, server_id):
+        """
+        Gets the entries of a server, reading its file the first time.
+        """
+        entries = self._servers.get(server_id)
+        if entries is not None:
+            return entries
+        entries = {}
+        lines = 0
+        broken = False
+        try:
+            with open(self.get_file(server_id)) as history_file:
+                for line in history_file:
+                    try:
+                        played, count, data = json.loads(line)
+                    except ValueError:
+                        # a line cut off when the bot was killed.
+                        broken = True
+                        continue
+                    lines += 1
+                    entry = entries.get(data[0])
+                    if entry is None:
+                        entries[data[0]] = [played, count, data]
+                    else:
+                        entry[0] = max(entry[0], played)
+                        entry[1] += count
+                        entry[2] = data
+        except OSError:
+            pass
+        self._servers[server_id] = entries
+        self._lines[server_id] = lines
+        if broken:
+            # so the next line is not appended to the cut off one.
+            self.compact(server_id)
+        return entries
+
+    def add(self, server_id, track):
+        """
+        Records that an song was played in a server.
+        """
+        entries = self.load(server_id)
+        played = round(time.time(), 3)
+        data = track.dump()
+        entry = entries.get(track.key)
+        if entry is None:
+            entries[track.key] = [played, 1, data]
+        else:
+            entry[0] = played
+            entry[1] += 1
+            entry[2] = data
+        try:
+            with open(self.get_file(server_id), 'a') as history_file:
+                history_file.write(json.dumps([played, 1, data]) + '\n')
+        except OSError:
+            return
+        self._lines[server_id] += 1
+        if self._lines[server_id] > max(200, len(entries) * 4):
+            self.compact(server_id)
+
+    def compact(self, server_id):
+        """
+        Rewrites the file of a server with one line per song.
+        """
+        entries = self.load(server_id)
+        file_name = self.get_file(server_id)
+        try:
+            with open(file_name + '.tmp', 'w') as history_file:
+                for entry in sorted(entries.values(),
+                                    key=lambda entry: entry[0]):
+                    history_file.write(json.dumps(entry) + '\n')
+            os.replace(file_name + '.tmp', file_name)
+        except OSError:
+            return
+        self._lines[server_id] = len(entries)
+
+    def recent(self, server_id, count=10):
+        """
+        Gets the songs last played in a server, latest first.
+
+        :return: list of (Track, play count, last played).
+        """
+        entries = sorted(self.load(server_id).values(),
+                         key=lambda entry: entry[0], reverse=True)
+        return [(Track.load(data), plays, played)
+                for played, plays, data in entries[:count]]
+
+    def top(self, server_id, count=10):
+        """
+        Gets the songs played the most in a server.
+
+        :return: list of (Track, play count, last played).
+        """
+        entries = sorted(self.load(server_id).values(),
+                         key=lambda entry: (entry[1], entry[0]),
+                         reverse=True)
+        return [(Track.load(data), plays, played)
+                for played, plays, data in entries[:count]]
+
+
+class ProcessSupervisor:
+    """
+    Keeps track of the ffmpeg process of every player by server so
+    the ones that are no longer used get killed and waited on instead
+    of staying around as zombies until the bot restarts.
+    """
+
+    def __init__(self):
+        self.processes = {}
+        self.reaped = 0
+        self.orphans = 0
+
+    def __len__(self):
+        self.sweep()
+        return sum(len(processes)
+                   for processes in self.processes.values())
+
+    def add(self, server_id, process):
+        """
+        Starts tracking the ffmpeg process of an player.
+        """
+        self.sweep()
+        self.processes.setdefault(server_id, set()).add(process)
+
+    @staticmethod
+    def kill(process):
+        """
+        Kills a process and waits on it.
+
+        :return: True if it was still running.
+        """
+        stop_read_ahead(process)
+        if process.poll() is not None:
+            return False
+        process.kill()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        return True
+
+    def sweep(self):
+        """
+        Forgets the processes that exited, poll waits on them so
+        they do not stay zombies.
+        """
+        for server_id, processes in list(self.processes.items()):
+            for process in list(processes):
+                if process.poll() is not None:
+                    processes.discard(process)
+            if not processes:
+                del self.processes[server_id]
+
+    def reap(self, server_id, keep=()):
+        """
+        Kills the processes of a server except the ones of the players
+        in keep.
+        """
+        keep = {getattr(player, 'process', None) for player in keep}
+        processes = self.processes.get(server_id, set())
+        for process in list(processes):
+            if process in keep:
+                continue
+            processes.discard(process)
+            if self.kill(process):
+                self.reaped += 1
+        if not processes:
+            self.processes.pop(server_id, None)
+
+    def reap_all(self):
+        """
+        Kills every process still tracked, used when the cog unloads.
+        """
+        for server_id in list(self.processes):
+            for process in self.processes.pop(server_id):
+                if self.kill(process):
+                    self.orphans += 1
+
+    def format_stats(self):
+        """
+        Formats the process counters for the resolverstats command.
+        """
+        return 'ffmpeg: {0} running, {1} reaped, {2} orphans'.format(
+            len(self), self.reaped, self.orphans)
+
+
+class FairLimiter:
+    """
+    Limits how many of something the bot can have at once across
+    every server. Servers waiting for one are served in turn so a
+    server asking for many can not starve the others.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.rejected = 0
+        # server id -> deque of the futures of its waiting requests,
+        # in the order the servers are served.
+        self.waiters = collections.OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(futures) for futures in self.waiters.values())
+
+    async def acquire(self, server_id, timeout=None):
+        """
+        Waits for a free slot.
+
+        :raises BotErrors.MaxPlayersError: when none was free in time.
+        """
+        if not self.limit or (self.used < self.limit and
+                              not self.waiters):
+            self.used += 1
+            return
+        future = asyncio.Future()
+        self.waiters.setdefault(
+            server_id, collections.deque()).append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # got a slot just as the time ran out.
+                return
+            self.rejected += 1
+            raise BotErrors.MaxPlayersError(
+                'The bot is too busy right now, try again later.')
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # got a slot just as the request was cancelled.
+                self.release()
+            raise
+        finally:
+            futures = self.waiters.get(server_id)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self.waiters[server_id]
+
+    def release(self):
+        """
+        Frees a slot, giving it to the next server waiting in turn.
+        """
+        self.used -= 1
+        while self.waiters and (not self.limit or
+                                self.used < self.limit):
+            server_id, futures = self.waiters.popitem(last=False)
+            future = futures.popleft()
+            if futures:
+                # to the back of the line for its next request.
+                self.waiters[server_id] = futures
+            if not future.done():
+                future.set_result(None)
+                self.used += 1
+
+    def format_stats(self, name):
+        """
+        Formats the counters for the voicestats command.
+        """
+        return '{0}: {1}/{2}, waiting: {3}, rejected: {4}'.format(
+            name, self.used, self.limit or 'unlimited', self.waiting,
+            self.rejected)
+
+
+class WarmFFmpegPool:
+    """
+    ffmpeg processes started ahead of time that read their input from
+    stdin, so starting an song does not have to wait for ffmpeg to
+    start. A thread downloads the song into the one it is given to
+    and the pool is filled up again in the background.
+
+    Only http sources use them, ffmpeg opens local files itself and
+    can seek in them, which some mp4 files need to be read at all.
+    """
+
+    def __init__(self, size, args):
+        self.size = size
+        self.args = args
+        self.idle = collections.deque()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.hits = 0
+        self.misses = 0
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1)
+        self.refill()
+
+    def refill(self):
+        """
+        Starts processes in the background until the pool is full.
+        """
+        if not self.closed:
+            self.executor.submit(self._fill)
+
+    def _fill(self):
+        while True:
+            with self.lock:
+                if self.closed or len(self.idle) >= self.size:
+                    return
+            try:
+                process = subprocess.Popen(
+                    self.args, stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError:
+                # ffmpeg is missing, songs start their own.
+                self.closed = True
+                return
+            with self.lock:
+                self.idle.append(process)
+
+    def take(self):
+        """
+        Gets a started process.
+
+        :return: The process, or None when none is ready.
+        """
+        process = None
+        with self.lock:
+            while self.idle and process is None:
+                process = self.idle.popleft()
+                if process.poll() is not None:
+                    process = None
+        self.refill()
+        if process is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return process
+
+    @staticmethod
+    def open_source(source, headers=None, start=0):
+        """
+        Opens an song from an url, start bytes in.
+        """
+        headers = dict(headers or {})
+        if start:
+            headers['Range'] = 'bytes={0}-'.format(start)
+        response = urllib.request.urlopen(urllib.request.Request(
+            source, headers=headers), timeout=30)
+        if start and response.status != 206:
+            response.close()
+            raise OSError('the server can not resume the song')
+        return response
+
+    @classmethod
+    def copy_source(cls, process, source, headers=None, reconnect=False):
+        """
+        Writes an song to the stdin of a process. With reconnect a
+        connection that drops is opened again where it stopped, like
+        the -reconnect options of ffmpeg do.
+        """
+        copied = 0
+        failures = 0
+        while True:
+            try:
+                with cls.open_source(source, headers, copied) as response:
+                    while True:
+                        chunk = response.read(65536)
+                        if not chunk:
+                            break
+                        try:
+                            process.stdin.write(chunk)
+                        except (OSError, ValueError):
+                            # the player was stopped.
+                            return
+                        copied += len(chunk)
+                        failures = 0
+                    # http responses cut off early have bytes left.
+                    if not getattr(response, 'length', None):
+                        return
+            except (OSError, ValueError, http.client.HTTPException):
+                pass
+            failures += 1
+            if not reconnect or failures > 5:
+                return
+            time.sleep(min(failures, 5))
+
+    @classmethod
+    def feed(cls, process, source, headers=None, reconnect=False):
+        """
+        Starts the thread writing an song to the stdin of a process.
+        """
+        def copy():
+            try:
+                cls.copy_source(process, source, headers, reconnect)
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+        threading.Thread(target=copy, daemon=True).start()
+
+    def format_stats(self):
+        """
+        Formats the counters for the voicestats command.
+        """
+        return 'warm ffmpeg: {0} ready, {1} hits, {2} misses'.format(
+            len(self.idle), self.hits, self.misses)
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False)
+        with self.lock:
+            for process in self.idle:
+                ProcessSupervisor.kill(process)
+            self.idle.clear()
+
+
+class LocalLibrary:
+    """
+    Index of the music files in a folder with an inverted index of
+    the words in their tags and names for fast searching.
+
+    The tags are read with mutagen when it is installed. The index is
+    saved to a file and only the files that changed since are read
+    again when the folder is scanned.
+    """
+
+    def __init__(self, folder, index_file, extensions):
+        self.folder = folder
+        self.index_file = index_file
+        self.extensions = tuple(extension.lower()
+                                for extension in extensions)
+        # path -> [mtime, size, title, artist, album, duration]
+        self.entries = {}
+        # word -> set of paths
+        self.words = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r'\w+', text.lower())
+
+    def make_words(self, entries):
+        words = {}
+        for path, entry in entries.items():
+            # the names of the file and its folder count as tags too.
+            folder, name = os.path.split(path)
+            text = ' '.join([str(value) for value in entry[2:5] if value] +
+                            [os.path.splitext(name)[0],
+                             os.path.basename(folder)])
+            for word in set(self.tokenize(text)):
+                words.setdefault(word, set()).add(path)
+        return words
+
+    def read_tags(self, path, stat):
+        """
+        Makes the entry of a file.
+        """
+        title = os.path.splitext(os.path.basename(path))[0]
+        artist = album = duration = None
+        if mutagen is not None:
+            try:
+                tagged = mutagen.File(path, easy=True)
+            except Exception:
+                tagged = None
+            if tagged is not None:
+                tags = tagged.tags or {}
+                title = (tags.get('title') or [title])[0]
+                artist = (tags.get('artist') or [None])[0]
+                album = (tags.get('album') or [None])[0]
+                duration = getattr(tagged.info, 'length', None)
+        return [stat.st_mtime, stat.st_size, title, artist, album,
+                duration]
+
+    def scan(self):
+        """
+        Brings the index up to date with the folder. This blocks so
+        run it in an executor.
+
+        :return: number of files read again.
+        """
+        entries = {}
+        changed = 0
+        folders = [self.folder]
+        while folders:
+            try:
+                items = list(os.scandir(folders.pop()))
+            except OSError:
+                continue
+            for item in items:
+                if item.is_dir():
+                    folders.append(item.path)
+                    continue
+                if not item.name.lower().endswith(self.extensions):
+                    continue
+                stat = item.stat()
+                entry = self.entries.get(item.path)
+                if entry is None or entry[0] != stat.st_mtime or \
+                        entry[1] != stat.st_size:
+                    entry = self.read_tags(item.path, stat)
+                    changed += 1
+                entries[item.path] = entry
+        if changed or len(entries) != len(self.entries):
+            words = self.make_words(entries)
+            # swapped at once so searches never see half of a scan.
+            self.entries, self.words = entries, words
+            self.save()
+        return changed
+
+    def load(self):
+        try:
+            with open(self.index_file) as index_file:
+                entries = json.load(index_file)
+        except (OSError, ValueError):
+            return
+        self.entries, self.words = entries, self.make_words(entries)
+
+    def save(self):
+        try:
+            with open(self.index_file, 'w') as index_file:
+                json.dump(self.entries, index_file)
+        except OSError:
+            pass
+
+    def search(self, query):
+        """
+        Finds the file whose tags or name have every word of a query
+        or is the query.
+
+        :return: youtube_dl like info dict or None.
+        """
+        entries = self.entries
+        if query in entries:
+            return self.make_info(query, entries[query])
+        if query.startswith(('http://', 'https://')):
+            return None
+        words = self.words
+        postings = [words.get(word) for word in self.tokenize(query)]
+        if not postings or not all(postings):
+            return None
+        postings.sort(key=len)
+        paths = set(postings[0]).intersection(*postings[1:])
+        if not paths:
+            return None
+        # the shortest title matches the most of it.
+        path = min(paths, key=lambda path: (len(str(entries[path][2])),
+                                            path))
+        return self.make_info(path, entries[path])
+
+    @staticmethod
+    def make_info(path, entry):
+        return {
+            'id': path, 'extractor_key': 'Local', 'url': path,
+            'webpage_url': path, 'title': entry[2], 'uploader': entry[3],
+            'duration': entry[5]}
+
+
+class TrackResolver:
+    """
+    Runs youtube_dl lookups on its own thread pool so they do
+    not starve the default executor.
+
+    Identical lookups that are already running are shared instead
+    of being run again, and each server can only have a few lookups
+    running at once so one busy server cannot take every thread.
+    Lookups the cache answers take no slot of the limiter.
+    """
+    def __init__(self, loop, ytdl_options, max_workers=8, server_limit=2,
+                 cache=None, limiter=None):
+        self.loop = loop
+        self.ytdl_options = ytdl_options
+        self.cache = cache
+        # FairLimiter of the lookups across every server.
+        self.limiter = limiter
+        self.server_limit = server_limit
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers)
+        self._local = threading.local()
+        self._in_flight = {}
+        self._server_locks = {}
+        # the pool threads update the timings, the event loop the rest.
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'coalesced': 0,
+            'failures': 0,
+            'running': 0,
+            'queue_wait_total': 0.0,
+            'queue_wait_max': 0.0,
+            'extract_total': 0.0,
+            'extract_max': 0.0,
+            'extracted': 0,
+        }
+
+    def _get_ytdl(self):
+        """
+        Gets the YoutubeDL instance of the current thread.
+        """
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            options = dict(self.ytdl_options)
+            # a video url with a list= in it only looks up the video,
+            # whole playlists are read by open_playlist.
+            options['noplaylist'] = True
+            ydl = youtube_dl.YoutubeDL(options)
+            self._local.ydl = ydl
+        return ydl
+
+    def _extract_info(self, query, requested):
+        """
+        Runs youtube_dl for a search string or url without
+        downloading anything. This blocks so it runs in the pool.
+        """
+        started = time.perf_counter()
+        waited = started - requested
+        with self.lock:
+            self.stats['queue_wait_total'] += waited
+            self.stats['queue_wait_max'] = max(
+                self.stats['queue_wait_max'], waited)
+        try:
+            info = self._get_ytdl().extract_info(query, download=False)
+            if 'entries' in info:
+                entries = list(info['entries'])
+                if not entries:
+                    raise youtube_dl.utils.DownloadError(
+                        'No results for {0}.'.format(query))
+                info = entries[0]
+            return info
+        finally:
+            took = time.perf_counter() - started
+            with self.lock:
+                self.stats['extracted'] += 1
+                self.stats['extract_total'] += took
+                self.stats['extract_max'] = max(
+                    self.stats['extract_max'], took)
+
+    def _get_server_lock(self, server_id):
+        lock = self._server_locks.get(server_id)
+        if lock is None:
+            lock = asyncio.Semaphore(self.server_limit)
+            self._server_locks[server_id] = lock
+        return lock
+
+    async def _resolve(self, query, server_id, timeout):
+        requested = time.perf_counter()
+        async with self._get_server_lock(server_id):
+            # the node wide slot is only taken once this server may
+            # run the lookup, so waiting lookups do not hold one.
+            if self.limiter is not None:
+                await self.limiter.acquire(server_id, timeout)
+            self.stats['running'] += 1
+            try:
+                info = await self.loop.run_in_executor(
+                    self.executor, self._extract_info, query, requested)
+            except Exception:
+                self.stats['failures'] += 1
+                raise
+            finally:
+                self.stats['running'] -= 1
+                if self.limiter is not None:
+                    self.limiter.release()
+        if self.cache is not None:
+            self.cache.put(query, info)
+        return info
+
+    async def resolve(self, query, server_id=None, timeout=None):
+        """
+        Gets the youtube_dl info dict for a search string or url.
+
+        :param query: search string or url.
+        :param server_id: id of the server asking, used for
+            the per server limit.
+        :param timeout: seconds to wait for a slot of the limiter,
+            None to wait as long as it takes.
+        :raises BotErrors.MaxPlayersError: when none was free in time.
+        """
+        self.stats['requests'] += 1
+        if self.cache is not None:
+            info = self.cache.get(query)
+            if info is not None:
+                return info
+        key = normalize_query(query)
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(
+            self._resolve(query, server_id, timeout), loop=self.loop)
+        self._in_flight[key] = future
+        future.add_done_callback(
+            lambda fut: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def _open_playlist(self, url):
+        """
+        Gets an iterator over the flat entries of a playlist. youtube_dl
+        fetches the pages of the playlist as the iterator is used.
+        """
+        options = dict(self.ytdl_options)
+        options['extract_flat'] = 'in_playlist'
+        info = youtube_dl.YoutubeDL(options).extract_info(
+            url, download=False, process=False)
+        return iter(info.get('entries') or [])
+
+    @staticmethod
+    def _next_entries(entries, count):
+        chunk = []
+        for entry in entries:
+            chunk.append(entry)
+            if len(chunk) == count:
+                break
+        return chunk
+
+    async def open_playlist(self, url, server_id=None):
+        """
+        Gets an iterator over the flat entries of a playlist for
+        next_entries to read from.
+        """
+        async with self._get_server_lock(server_id):
+            return await self.loop.run_in_executor(
+                self.executor, self._open_playlist, url)
+
+    async def next_entries(self, entries, server_id=None, count=50):
+        """
+        Gets the next chunk of flat entries of a playlist so big
+        playlists never have to be held in memory at once.
+
+        :return: list of entries, empty once the playlist ended.
+        """
+        async with self._get_server_lock(server_id):
+            return await self.loop.run_in_executor(
+                self.executor, self._next_entries, entries, count)
+
+    def get_stats(self):
+        """
+        Gets a copy of the lookup counters.
+        """
+        with self.lock:
+            return dict(self.stats)
+
+    def format_stats(self):
+        """
+        Formats the lookup timing counters for the resolverstats command.
+        """
+        stats = self.get_stats()
+        extracted = stats['extracted'] or 1
+        message = (
+            'requests: {0}, coalesced: {1}, failures: {2}, running: {3}\n'
+            'queue wait avg: {4:.3f}s max: {5:.3f}s\n'
+            'extract avg: {6:.3f}s max: {7:.3f}s').format(
+            stats['requests'], stats['coalesced'], stats['failures'],
+            stats['running'], stats['queue_wait_total'] / extracted,
+            stats['queue_wait_max'], stats['extract_total'] / extracted,
+            stats['extract_max'])
+        if self.cache is not None:
+            message += '\ncache: {0} entries, {1} hits, {2} misses'.format(
+                len(self.cache), self.cache.hits, self.cache.misses)
+        return message
+
+    def close(self):
+        """
+        Stops the thread pool once the running lookups finish.
+        """
+        self.executor.shutdown(wait=False)
+
+
+class VoiceMetrics:
+    """
+    Counters and latency histograms of the voice cog. The players
+    and the resolver threads update them so they use a lock.
+    """
+    # upper bounds in seconds of the histogram buckets.
+    buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    histograms = ('first_frame', 'resolve', 'ffmpeg_spawn', 'rejoin')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = collections.Counter()
+        self.timings = {name: self.make_histogram()
+                        for name in self.histograms}
+
+    def make_histogram(self):
+        return {'count': 0, 'total': 0.0, 'max': 0.0,
+                'buckets': [0] * (len(self.buckets) + 1)}
+
+    def incr(self, name, count=1):
+        """
+        Adds to a counter.
+        """
+        with self.lock:
+            self.counters[name] += count
+
+    def observe(self, name, seconds):
+        """
+        Adds a timing to a histogram.
+        """
+        with self.lock:
+            histogram = self.timings[name]
+            histogram['count'] += 1
+            histogram['total'] += seconds
+            histogram['max'] = max(histogram['max'], seconds)
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    index = i
+                    break
+            histogram['buckets'][index] += 1
+
+    def watch_first_frame(self, player, requested):
+        """
+        Records the time from requested to the first audio frame
+        the player sends.
+        """
+        send = player.player
+
+        def first_frame(*args, **kwargs):
+            player.player = send
+            self.observe('first_frame', time.perf_counter() - requested)
+            return send(*args, **kwargs)
+        player.player = first_frame
+
+    def as_dict(self, sessions):
+        """
+        Gets every metric as a dict that can be saved as json.
+
+        :param sessions: the VoiceChannel instances of the cog.
+        """
+        with self.lock:
+            data = {
+                'uptime': time.time() - self.started,
+                'counters': dict(self.counters),
+                'timings': {
+                    name: dict(histogram,
+                               buckets=list(histogram['buckets']))
+                    for name, histogram in self.timings.items()},
+                'bucket_bounds': list(self.buckets)}
+        data['active_players'] = sum(
+            1 for session in sessions if session.player is not None and
+            session.is_bot_playing)
+        data['queue_lengths'] = {
+            session.server_id: len(session.queue)
+            for session in sessions}
+        return data
+
+    def format_stats(self, sessions):
+        """
+        Formats the metrics for the voicestats command.
+        """
+        data = self.as_dict(sessions)
+        queues = list(data['queue_lengths'].values())
+        lines = [
+            'sessions: {0}, active players: {1}'.format(
+                len(queues), data['active_players']),
+            'queue length total: {0} max: {1}'.format(
+                sum(queues), max(queues or [0])),
+            'player errors: {0}, underruns: {1}'.format(
+                data['counters'].get('player_errors', 0),
+                data['counters'].get('underruns', 0)),
+            'rejoined: {0}, rejoins failed: {1}'.format(
+                data['counters'].get('rejoined', 0),
+                data['counters'].get('rejoin_failures', 0))]
+        for name in self.histograms:
+            histogram = data['timings'][name]
+            lines.append('{0}: {1} avg: {2:.3f}s max: {3:.3f}s'.format(
+                name, histogram['count'],
+                histogram['total'] / (histogram['count'] or 1),
+                histogram['max']))
+        return '\n'.join(lines)
+
+
+class VoiceChannel:
+    """
+    Class that should hopefully catch states
+    for all voice channels the bot joins in on.
+    """
+    def __init__(self, bot, botvoicechannel,
+                 voicechannelobj, textchannelobj, max_queue_length=0):
+        """
+        Creates an instance of the VoiceChannel object
+        to use in with the Voice Commands.
+
+        This requires that voicechannelobj and textchannelobj
+        are channel objects. This means making the objects when
+        bot restarts on voice channel rejoins.
+
+        :param voicechannelobj: Object to the Voice Channel
+            the VoiceChannel object is for.
+        :param textchannelobj:  Object to the Text Channel
+            the VoiceChannel object is for.
+        :param max_queue_length: maximum number of songs in
+            the playlist, 0 for no limit.
+        """
+        self.bot = bot
+        self.botvoicechannel = botvoicechannel
+        self.vchannel = voicechannelobj
+        self.voice_message_channel = textchannelobj
+        self.voice_message_server = textchannelobj.server
+        self.voice = None
+        self.player = None
+        # volume for the songs played here, set by the vol command.
+        self.volume = 1.0
+        self._sent_finished_message = False
+        self.is_bot_playing = False
+        # set while a song is being started, so a command arriving in
+        # the meantime queues its song instead of starting another.
+        self.starting = False
+        # to replace the temp player and normal player crap soon.
+        self.player_list = []
+        self.queue = TrackQueue(max_queue_length)
+        # task that opens the next song before the current one ends.
+        self.prefetch_task = None
+        # set while that task is opening the song.
+        self.prefetch_opening = False
+        # (Track, player) opened by the prefetch task.
+        self.prefetched = None
+        # denotes if an error happened while joining the
+        # Voice Channel.
+        self.verror = False
+        # monotonic times the Voice Channel became empty and nothing
+        # started playing, None while it is not.
+        self.empty_since = None
+        self.idle_since = None
+        # the player was paused because everyone left.
+        self.paused_empty = False
+        # encoding profile picked with the quality command, None for
+        # the one in the settings.
+        self.profile = None
+        # holds a slot of the node wide budget of playing songs.
+        self.has_player_slot = False
+
+    @property
+    def server_id(self):
+        """
+        Id of the server this instance is registered under.
+        """
+        return self.voice_message_server.id
+
+    async def join(self):
+        """
+        Joins the particular voice channel.
+        """
+        self.voice = await self.bot.join_voice_channel(
+            self.vchannel)
+        self.botvoicechannel[self.server_id] = {
+            'text': self.voice_message_channel.id,
+            'voice': self.vchannel.id}
+        self.write_json()
+
+    def is_idle(self):
+        """
+        Checks if nothing plays here and no song is being started.
+        """
+        return self.is_bot_playing is False and not self.starting
+
+    def save_playlist(self, write=True):
+        """
+        Saves the songs of the playlist and the position in the
+        current song with the Voice Channel so they can be resumed
+        after a reload or restart. Only the song urls are saved, never
+        the stream urls as they expire.
+        """
+        data = self.botvoicechannel.get(self.server_id)
+        if data is None:
+            return
+        track = getattr(self.player, 'track', None)
+        position = 0
+        if track is not None and not self.player.is_live:
+            position = round(get_player_elapsed(self.player), 1)
+        data['playlist'] = {
+            'current': None if track is None else track.dump(),
+            'position': position,
+            'queue': [queued.dump() for queued in self.queue]}
+        if write:
+            self.write_json()
+
+    def write_json(self):
+        """
+        writes the data to file.
+        """
+        json.dump(self.botvoicechannel, open(get_voice_channel_file(), "w"))
+
+    def add_player(self, player):
+        """
+        Adds an player to the Voice Channel list.
+
+        Note: All finished / stopped players must
+        be removed from the list to prevent breakage
+        of this cog. To do that cache the current player
+        before starting and then when it is
+        finished / stopped remove it by calling
+        remove_player.
+        """
+        # cap list at 15 players per instance.
+        if len(self.player_list) < 15:
+            self.player_list.append(player)
+        else:
+            raise BotErrors.MaxPlayersError(
+                "The maximum number of players for this"
+                " Voice Channel has been reached.")
+
+    def remove_player(self, player):
+        """
+        Adds an player to the Voice Channel list.
+        """
+        self.player_list.remove(player)
+
+    async def leave(self):
+        """
+        Leaves the particular voice channel.
+        """
+        self.botvoicechannel.pop(self.server_id, None)
+        self.write_json()
+        self.stop_player()
+        self.is_bot_playing = False
+        self.cancel_prefetch()
+        self.queue.clear()
+        try:
+            await self.voice.disconnect()
+        except ConnectionResetError:
+            # Supress a Error here.
+            pass
+
+    def stop_player(self):
+        """
+        Stops the player. A paused one is resumed as well, otherwise
+        its thread keeps waiting to be resumed and never exits.
+        """
+        if self.player is not None:
+            self.player.stop()
+            self.player.resume()
+            self.player = None
+
+    def cancel_prefetch(self):
+        """
+        Stops opening the next song and drops the player
+        already opened for it.
+        """
+        if self.prefetch_task is not None:
+            self.prefetch_task.cancel()
+            self.prefetch_task = None
+        if self.prefetched is not None:
+            reap_player(self.prefetched[1])
+            self.prefetched = None
+
+    def take_prefetched(self, track):
+        """
+        Gets the player opened for an song by the prefetch task.
+
+        :return: The player, or None when it was not opened or
+            another song was opened instead.
+        """
+        prefetched, self.prefetched = self.prefetched, None
+        if prefetched is None:
+            return None
+        if prefetched[0] is track:
+            return prefetched[1]
+        reap_player(prefetched[1])
+        return None
+
+    async def move(self, voicechannelobj):
+        """
+        Move to an particular voice channel.
+
+        :param voicechannelobj: Voice Channel
+            object to move to.
+        """
+        await self.voice.move_to(voicechannelobj)
+        self.vchannel = voicechannelobj
+        self.botvoicechannel.setdefault(self.server_id, {})[
+            'voice'] = self.vchannel.id
+        self.write_json()
+
+    async def create_player(self, *args, **kwargs):
+        """
+        Handles creating all the player stuff for me.
+
+        This helps makes this class easier for the
+        rewrite to use.
+        """
+        self.add_player(
+            await self.voice.create_ytdl_player(
+                *args, **kwargs))
+
+
+class Voice:
+    """
+    Voice Channel Commands class for DecoraterBot.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.botvoicechannel = PluginConfigReader(
+            file='BotVoiceChannel.json')
+        self.migrate_voice_channel_data()
+        self.settings = read_voice_settings()
+        # this will remain the same.
+        self.ytdlo = {
+            'verbose': False,
+            'logger': YTDLLogger(self.bot),
+            'default_search': "ytsearch"
+        }
+        # the options create_ytdl_player would use.
+        self.ytdl_options = {
+            'format': 'webm[abr>0]/bestaudio/best',
+            'prefer_ffmpeg': True,
+        }
+        self.ytdl_options.update(self.ytdlo)
+        self.info_cache = InfoCache(
+            maxsize=self.settings['info_cache_size'],
+            ttl=self.settings['info_cache_ttl'])
+        if self.settings['info_cache_persist']:
+            self.info_cache.load(
+                get_cache_path(self.settings, 'info_cache.json'))
+        # node wide budgets of playing songs and youtube_dl lookups.
+        self.player_limiter = FairLimiter(self.settings['max_players'])
+        self.resolve_limiter = FairLimiter(
+            self.settings['max_pending_resolves'])
+        self.resolver = TrackResolver(
+            self.bot.loop, self.ytdl_options,
+            max_workers=self.settings['resolver_threads'],
+            server_limit=self.settings['resolver_server_limit'],
+            cache=self.info_cache, limiter=self.resolve_limiter)
+        self.audio_cache = AudioCache(
+            get_cache_path(self.settings, 'audio'),
+            self.settings['audio_cache_bytes'], self.ytdl_options,
+            max_duration=self.settings['audio_cache_max_duration'])
+        self.loudness = None
+        if self.settings['normalize_loudness'] or \
+                self.settings['skip_silence'] > 0:
+            self.loudness = LoudnessCache(
+                get_cache_path(self.settings, 'loudness.json'),
+                maxsize=self.settings['loudness_cache_size'],
+                silence=self.settings['skip_silence'],
+                max_duration=self.settings['audio_cache_max_duration'],
+                max_workers=self.settings['loudness_threads'])
+        self.history = None
+        if self.settings['play_history']:
+            self.history = PlayHistory(
+                get_cache_path(self.settings, 'history'))
+        # sound effects for the sfx command, name -> int16 PCM.
+        self.clips = {}
+        self.library = None
+        if self.settings['library_dir']:
+            self.library = LocalLibrary(
+                self.settings['library_dir'],
+                get_cache_path(self.settings, 'library_index.json'),
+                self.settings['library_extensions'])
+            self.library.load()
+        # ffmpeg processes of the players of every server.
+        self.supervisor = ProcessSupervisor()
+        # this will remain the same.
+        self.ffmop = "-nostats -loglevel quiet"
+        self.warm_pool = None
+        # the warm processes are started with the input buffer of the
+        # default profile, other profiles start their own.
+        self.warm_buffer = self.settings['encoding_profiles'].get(
+            self.settings['encoding_profile'], {}).get('buffer')
+        if self.settings['warm_ffmpeg'] > 0:
+            args = ['ffmpeg']
+            if self.warm_buffer:
+                args.extend(['-thread_queue_size', str(self.warm_buffer)])
+            self.warm_pool = WarmFFmpegPool(
+                self.settings['warm_ffmpeg'],
+                args + ['-i', 'pipe:0', '-f', 's16le', '-ar', '48000',
+                        '-ac', '2'] + shlex.split(self.ffmop) + ['pipe:1'])
+        self.workers = None
+        if self.settings['voice_workers'] > 0 and numpy is not None:
+            self.workers = VoiceWorkerPool(self.settings['voice_workers'])
+        self.metrics = VoiceMetrics()
+        # task leaving the Voice Channels nobody uses, task checking
+        # if players fall behind, task scanning the local library, task
+        # looking up the most played songs and task saving the
+        # playlists, started by setup.
+        self.reaper_task = None
+        self.lag_task = None
+        self.library_task = None
+        self.prewarm_task = None
+        self.save_task = None
+        # set when a song starts so the playlists get saved.
+        self.playlists_changed = False
+        # VoiceChannel class instances keyed by server id to keep track
+        # of them all.
+        self.voiceobjs = {}
+        # Global bool to prevent the bot from being able to join a voice channel
+        # while logging in. This is Essentially a fix to the bot not being able
+        # to actually send messages in the voice commands as they would
+        # drastically screw up.
+        self.lock_join_voice_channel_command = False
+        # For loading Voice Channel message data.
+        self.voice_text = PluginTextReader(
+            file='voice.json')
+        self.resolve_send_message_error = (
+            self.bot.BotPMError.resolve_send_message_error)
+        self.rsme = self.resolve_send_message_error
+
+    def setup(self):
+        """
+        Allows bot to rejoin voice channel when reloading.
+        """
+        self.bot.loop.create_task(self.__load())
+        self.reaper_task = self.bot.loop.create_task(
+            self.reap_idle_sessions())
+        self.lag_task = self.bot.loop.create_task(self.watch_player_lag())
+        if self.library is not None:
+            self.library_task = self.bot.loop.create_task(
+                self.scan_library())
+        if numpy is not None and self.settings['sfx_dir']:
+            self.bot.loop.run_in_executor(None, self.load_clips)
+        if self.history is not None and self.settings['history_prewarm']:
+            self.prewarm_task = self.bot.loop.create_task(
+                self.prewarm_history())
+        self.save_task = self.bot.loop.create_task(self.save_playlists())
+
+    def get_session(self, server):
+        """
+        Gets the VoiceChannel instance for a server.
+
+        :param server: Server object (or anything with an id).
+        :return: VoiceChannel or None if the bot is not in voice there.
+        """
+        if server is None:
+            return None
+        return self.voiceobjs.get(server.id)
+
+    def migrate_voice_channel_data(self):
+        """
+        Converts the single Voice Channel older versions saved in
+        BotVoiceChannel.json as the Bot_Current_Voice_Channel list of
+        [voice id, server id, text channel id, server name, voice
+        channel name] to the data of its server.
+        """
+        legacy = self.botvoicechannel.pop('Bot_Current_Voice_Channel',
+                                          None)
+        if legacy is None:
+            return
+        if isinstance(legacy, list) and len(legacy) >= 3 and \
+                str(legacy[1]) not in self.botvoicechannel:
+            self.botvoicechannel[str(legacy[1])] = {
+                'text': str(legacy[2]), 'voice': str(legacy[0])}
+        self.write_voice_channel_file(json.dumps(self.botvoicechannel))
+
+    def persisted_sessions(self):
+        """
+        Gets the server id, text channel id and voice channel id of
+        every Voice Channel saved in BotVoiceChannel.json.
+        """
+        return [
+            (server_id, data['text'], data['voice'])
+            for server_id, data in list(self.botvoicechannel.items())
+            if isinstance(data, dict) and
+            'text' in data and 'voice' in data]
+
+    def make_session(self, server_id, textchannel_id, voice_id):
+        """
+        Makes an VoiceChannel instance from the cached id's, using the
+        real channel objects when they are in the client cache.
+        """
+        voicechannelobj = self.bot.get_channel(voice_id)
+        textchannelobj = self.bot.get_channel(textchannel_id)
+        if voicechannelobj is None or textchannelobj is None:
+            voicechannelobj, textchannelobj = make_voice_info(
+                server_id, textchannel_id, voice_id)
+        return VoiceChannel(self.bot, self.botvoicechannel,
+                            voicechannelobj, textchannelobj,
+                            self.settings['max_queue_length'])
+
+    async def rejoin_session(self, server_id, textchannel_id, voice_id):
+        """
+        Rejoins a persisted Voice Channel and registers it.
+
+        :return: True if the Voice Channel was rejoined.
+        """
+        if server_id in self.voiceobjs:
+            return True
+        # join overwrites the saved data of the server.
+        playlist = self.botvoicechannel.get(server_id, {}).get('playlist')
+        session = self.make_session(server_id, textchannel_id, voice_id)
+        try:
+            await session.join()
+        except discord.ConnectionClosed:
+            return False
+        except (discord.InvalidArgument, discord.ClientException):
+            session.verror = True
+        except BotErrors.CommandTimeoutError:
+            session.verror = True
+            try:
+                await self.bot.send_message(
+                    session.voice_message_channel, content=str(
+                        self.voice_text[
+                            'reload_commands_voice_channels_bypass2'][0]))
+            except discord.HTTPException:
+                pass
+        except RuntimeError:
+            session.verror = True
+            try:
+                await self.bot.send_message(
+                    session.voice_message_channel, content=str(
+                        self.voice_text[
+                            'reload_commands_voice_channels_bypass2'][1]))
+            except discord.HTTPException:
+                pass
+        if session.verror:
+            return False
+        self.voiceobjs[server_id] = session
+        try:
+            message_data = str(
+                self.voice_text[
+                    'reload_commands_voice_channels_bypass2'
+                ][2]).format(session.vchannel.name)
+            await self.bot.send_message(session.voice_message_channel,
+                                        content=message_data)
+        except discord.HTTPException:
+            pass
+        if playlist:
+            await self.restore_playlist(session, playlist)
+        return True
+
+    async def restore_playlist(self, session, playlist):
+        """
+        Adds back the songs saved by VoiceChannel.save_playlist and
+        resumes the song that was playing where it was stopped.
+        """
+        for data in playlist.get('queue', []):
+            session.queue.put(Track.load(data))
+        if playlist.get('current'):
+            try:
+                await self.start_track(
+                    session, Track.load(playlist['current']),
+                    offset=playlist.get('position', 0))
+                return
+            except youtube_dl.utils.DownloadError:
+                pass
+        if len(session.queue):
+            await self.play_next(session, 'auto_playlist_data')
+
+    async def rejoin_sessions(self):
+        """
+        Rejoins every persisted Voice Channel at once, a few at a
+        time, so a server that fails or hangs does not hold up the
+        others.
+        """
+        semaphore = asyncio.Semaphore(
+            max(1, self.settings['rejoin_concurrency']))
+        timeout = self.settings['rejoin_timeout']
+
+        async def rejoin(server_id, textchannel_id, voice_id):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self.rejoin_session(
+                            server_id, textchannel_id, voice_id),
+                        timeout)
+                except asyncio.TimeoutError:
+                    return False
+                except Exception as e:
+                    str(e)
+                    return False
+
+        persisted = self.persisted_sessions()
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[rejoin(*data) for data in persisted])
+        if persisted:
+            # shown by the voicestats command.
+            self.metrics.observe('rejoin', time.perf_counter() - start)
+            self.metrics.incr('rejoined', results.count(True))
+            self.metrics.incr('rejoin_failures',
+                              len(persisted) - results.count(True))
+
+    async def __load(self):
+        """
+        Makes bot able to join a voice channel when the commands are loaded.
+        """
+        await self.rejoin_sessions()
+
+    def __unload(self):
+        """
+        Makes bot able to leave Voice channel when reloading or unloading
+        voice commands.
+
+        The caches and playlists are saved right away, as the cog that
+        replaces this one reads them as soon as it is made.
+        """
+        for task in (self.reaper_task, self.lag_task, self.library_task,
+                     self.prewarm_task, self.save_task):
+            if task is not None:
+                task.cancel()
+        self.resolver.close()
+        self.audio_cache.close()
+        if self.audio_cache.enabled:
+            try:
+                self.audio_cache.save()
+            except OSError:
+                pass
+        if self.settings['info_cache_persist']:
+            try:
+                self.info_cache.save(
+                    get_cache_path(self.settings, 'info_cache.json'))
+            except OSError:
+                pass
+        if self.loudness is not None:
+            self.loudness.close()
+            try:
+                self.loudness.save()
+            except OSError:
+                pass
+        sessions = list(self.voiceobjs.values())
+        self.voiceobjs.clear()
+        for session in sessions:
+            session.save_playlist(write=False)
+        if sessions:
+            sessions[0].write_json()
+        for session in sessions:
+            session.stop_player()
+            session.is_bot_playing = False
+            self.release_player(session)
+            session.cancel_prefetch()
+            session.queue.clear()
+        self.supervisor.reap_all()
+        self.bot.loop.create_task(self.__reload(sessions))
+
+    async def __reload(self, sessions):
+        """
+        Leaves the Voice Channels of the VoiceChannel instances
+        __unload stopped.
+        """
+        for session in sessions:
+            try:
+                await session.voice.disconnect()
+                reason = str(
+                    self.voice_text[
+                        'reload_commands_voice_channels_bypass1'
+                    ][1])
+                message_data = str(
+                    self.voice_text[
+                        'reload_commands_voice_channels_bypass1'][
+                        0]).format(session.vchannel.name, reason)
+                await self.bot.send_message(session.voice_message_channel,
+                                            content=message_data)
+            except Exception as e:
+                str(e)
+        if self.workers is not None:
+            self.workers.close()
+        if self.warm_pool is not None:
+            self.warm_pool.close()
+
+    async def leave_session(self, session):
+        """
+        Unregisters an VoiceChannel instance and leaves its Voice
+        Channel.
+        """
+        self.voiceobjs.pop(session.server_id, None)
+        await session.leave()
+        self.supervisor.reap(session.server_id)
+        self.release_player(session)
+
+    def check_listeners(self, session):
+        """
+        Pauses the player of an VoiceChannel instance when everyone
+        left its Voice Channel and resumes it when someone is back.
+        """
+        channel = getattr(session.voice, 'channel', session.vchannel)
+        listeners = count_listeners(channel)
+        if listeners is None:
+            return
+        player = session.player
+        if listeners == 0:
+            if session.empty_since is None:
+                session.empty_since = time.monotonic()
+            if player is not None and player.is_playing():
+                pause_player(player)
+                session.paused_empty = True
+        else:
+            session.empty_since = None
+            if session.paused_empty:
+                session.paused_empty = False
+                if player is not None:
+                    player.resume()
+
+    async def on_voice_state_update(self, before, after):
+        """
+        Bot Event.
+        :param before: State.
+        :param after: State.
+        :return: Nothing.
+        """
+        session = self.get_session(after.server)
+        if session is not None:
+            self.check_listeners(session)
+
+    async def reap_idle_sessions(self):
+        """
+        Leaves the Voice Channels nobody listened to or nothing was
+        played in for longer than the timeouts, freeing their
+        connection and ffmpeg processes.
+        """
+        while True:
+            await asyncio.sleep(self.settings['reaper_interval'])
+            now = time.monotonic()
+            for session in list(self.voiceobjs.values()):
+                self.check_listeners(session)
+                if session.player is not None:
+                    session.idle_since = None
+                elif session.idle_since is None:
+                    session.idle_since = now
+                empty_timeout = self.settings['empty_timeout']
+                idle_timeout = self.settings['idle_timeout']
+                if empty_timeout and session.empty_since is not None and \
+                        now - session.empty_since >= empty_timeout:
+                    reason = 'nobody was listening'
+                elif idle_timeout and session.idle_since is not None and \
+                        now - session.idle_since >= idle_timeout:
+                    reason = 'nothing was played'
+                else:
+                    continue
+                try:
+                    await self.leave_session(session)
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content='Left {0} as {1} for a while.'.format(
+                            session.vchannel.name, reason))
+                except Exception as e:
+                    str(e)
+
+    async def on_ready(self):
+        """
+        When Bot is ready.
+        """
+        if self.bot.initial_rejoin_voice_channel:
+            self.bot.initial_rejoin_voice_channel = False
+            self.lock_join_voice_channel_command = True
+            try:
+                await self.rejoin_sessions()
+            finally:
+                self.lock_join_voice_channel_command = False
+
+    @commands.command(name='JoinVoiceChannel', pass_context=True, no_pm=True)
+    async def join_voice_channel_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        elif self.get_session(ctx.message.server) is not None:
+            try:
+                message_data = str(
+                    self.voice_text['join_voice_channel_command_data'][
+                        0]).format(ctx.message.server.name)
+                await self.bot.send_message(ctx.message.channel,
+                                            content=message_data)
+            except discord.Forbidden:
+                await self.bot.BotPMError.resolve_send_message_error(self.bot,
+                                                                     ctx)
+        elif not self.lock_join_voice_channel_command:
+            if ctx.message.author.voice_channel is None:
+                return
+            session = VoiceChannel(
+                self.bot, self.botvoicechannel,
+                ctx.message.author.voice_channel, ctx.message.channel,
+                self.settings['max_queue_length'])
+            msg_index = None
+            try:
+                await session.join()
+            except discord.ConnectionClosed:
+                return
+            except RuntimeError:
+                msg_index = 6
+            except discord.InvalidArgument:
+                msg_index = 2
+            except BotErrors.CommandTimeoutError:
+                msg_index = 3
+            except discord.HTTPException:
+                msg_index = 4
+            except discord.opus.OpusNotLoaded:
+                msg_index = 5
+            except IndexError:
+                return
+            if msg_index is None:
+                self.voiceobjs[session.server_id] = session
+                msg_index = 1
+            try:
+                msg_data = str(
+                    self.voice_text[
+                        'join_voice_channel_command_data'
+                    ][msg_index]).format(session.vchannel.name)
+                await self.bot.send_message(ctx.message.channel,
+                                            content=msg_data)
+            except discord.Forbidden:
+                await self.resolve_send_message_error(self.bot, ctx)
+
+    @commands.command(name='play', pass_context=True, no_pm=True)
+    async def play_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        requested = time.perf_counter()
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            message_data = str(
+                self.voice_text['play_command_data'][8])
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+            return
+        elif ctx.message.channel.id != session.voice_message_channel.id:
+            return
+        content = ctx.message.content[len(ctx.prefix + "play "):].strip()
+        if '|' in content or '\n' in content:
+            await self.play_batch(ctx, session, content, requested)
+            return
+        data = self.get_play_query(ctx)
+        if data == "":
+            try:
+                message_data = str(
+                    self.voice_text['play_command_data'][
+                        9 if session.is_bot_playing else 0])
+                await self.bot.send_message(
+                    session.voice_message_channel,
+                    content=message_data)
+            except discord.Forbidden:
+                await self.resolve_send_message_error(self.bot, ctx)
+            return
+        elif data is None:
+            return
+        if is_playlist_url(data):
+            await self.import_playlist(ctx, session, data)
+            return
+        try:
+            info = await self.extract_info(
+                data, session.server_id, self.settings['admission_timeout'])
+        except BotErrors.MaxPlayersError as e:
+            await self.bot.send_message(ctx.message.channel,
+                                        content=str(e))
+            return
+        except youtube_dl.utils.UnsupportedError:
+            await self.bot.send_message(
+                ctx.message.channel, content=str(
+                    self.voice_text['play_command_data'][5]))
+            return
+        except youtube_dl.utils.ExtractorError:
+            await self.bot.send_message(
+                ctx.message.channel, content=str(
+                    self.voice_text['play_command_data'][6]))
+            return
+        except youtube_dl.utils.DownloadError:
+            await self.bot.send_message(
+                ctx.message.channel, content=str(
+                    self.voice_text['play_command_data'][7]))
+            return
+        track = Track.from_info(info)
+        if session.is_idle():
+            try:
+                await self.start_track(
+                    session, track, info, requested,
+                    timeout=self.settings['admission_timeout'])
+            except BotErrors.MaxPlayersError as e:
+                await self.bot.send_message(ctx.message.channel,
+                                            content=str(e))
+        elif track.key in session.queue:
+            message_data = str(
+                self.voice_text['play_command_data'][14])
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        elif session.queue.full():
+            message_data = str(
+                self.voice_text['play_command_data'][15])
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        else:
+            self.queue_track(session, track)
+            message_data = str(
+                self.voice_text['play_command_data'][13]).format(
+                self.format_track_title(track),
+                self.format_track_time(track))
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+
+    def get_play_query(self, ctx):
+        """
+        Gets the search string or url passed to the play command.
+
+        :return: The query, or None for urls that are not supported.
+        """
+        return self.clean_play_query(
+            ctx.message.content[len(ctx.prefix + "play "):])
+
+    @staticmethod
+    def clean_play_query(data):
+        """
+        Cleans up a search string or url given to the play command.
+
+        :return: The query, or None for urls that are not supported.
+        """
+        data = data.strip()
+        if data.startswith('<') and data.endswith('>'):
+            data = data[1:-1]
+        if data.rfind('https://') == -1 and data.rfind('http://') == -1:
+            return data
+        if 'www.youtube.com/watch?v=' in data or \
+                'soundcloud.com' in data or is_playlist_url(data):
+            return data
+        return None
+
+    async def play_batch(self, ctx, session, content, requested=None):
+        """
+        Looks up the songs of a play command naming several at once
+        together and adds them to the playlist of an VoiceChannel
+        instance in the order they were given, starting the first one
+        if nothing is playing. Replies once with what was added.
+        """
+        queries = [query for query in map(
+            self.clean_play_query, re.split(r'[|\n]', content))
+            if query != ''][:self.settings['max_batch_songs']]
+        # the resolver limits how many run at once for a server.
+        results = await asyncio.gather(*[
+            self.extract_batch_info(query, session.server_id)
+            for query in queries])
+        added = 0
+        failed = 0
+        skipped = 0
+        for info in results:
+            if info is None:
+                failed += 1
+                continue
+            if self.get_session(ctx.message.server) is not session:
+                # left the Voice Channel while looking them up.
+                return
+            track = Track.from_info(info)
+            if session.is_idle():
+                try:
+                    await self.start_track(
+                        session, track, info, requested,
+                        timeout=self.settings['admission_timeout'],
+                        announce=False)
+                except BotErrors.MaxPlayersError as e:
+                    await self.bot.send_message(ctx.message.channel,
+                                                content=str(e))
+                    return
+                added += 1
+            elif self.queue_track(session, track):
+                added += 1
+            else:
+                skipped += 1
+        message_data = 'Added {0} of {1} songs.'.format(
+            added, len(queries))
+        if failed:
+            message_data += ' {0} could not be found.'.format(failed)
+        if skipped:
+            message_data += (' {0} were already in the playlist or it '
+                             'was full.').format(skipped)
+        await self.bot.send_message(ctx.message.channel,
+                                    content=message_data)
+
+    async def extract_batch_info(self, query, server_id):
+        """
+        Gets the youtube_dl info dict for one song of a play command
+        naming several.
+
+        :return: The info dict, or None if it could not be found.
+        """
+        if query is None or is_playlist_url(query):
+            return None
+        try:
+            return await self.extract_info(
+                query, server_id, self.settings['admission_timeout'])
+        except (BotErrors.MaxPlayersError,
+                youtube_dl.utils.UnsupportedError,
+                youtube_dl.utils.ExtractorError,
+                youtube_dl.utils.DownloadError):
+            return None
+
+    def queue_track(self, session, track):
+        """
+        Adds an song to the end of the playlist of an
+        VoiceChannel instance.
+
+        :return: False if it is already in it or it is full.
+        """
+        if not session.queue.put(track):
+            return False
+        if session.prefetched is None and (
+                session.prefetch_task is None or
+                session.prefetch_task.done()):
+            # the song that is playing was already near its end.
+            self.schedule_prefetch(session)
+        return True
+
+    async def import_playlist(self, ctx, session, url):
+        """
+        Adds the songs of a YouTube playlist to the playlist of an
+        VoiceChannel instance as they are read. The songs are only
+        resolved once they get near the front of the playlist.
+        """
+        added = 0
+        try:
+            entries = await self.resolver.open_playlist(
+                url, session.server_id)
+            while not session.queue.full():
+                chunk = await self.resolver.next_entries(
+                    entries, session.server_id)
+                if not chunk:
+                    break
+                if self.get_session(ctx.message.server) is not session:
+                    # left the Voice Channel while importing.
+                    return
+                for entry in chunk:
+                    track = Track.from_entry(entry)
+                    if track is None:
+                        continue
+                    if session.is_idle():
+                        try:
+                            await self.start_track(
+                                session, track, timeout=self.settings[
+                                    'admission_timeout'])
+                            added += 1
+                        except youtube_dl.utils.DownloadError:
+                            pass
+                    elif self.queue_track(session, track):
+                        added += 1
+        except youtube_dl.utils.DownloadError:
+            await self.bot.send_message(
+                ctx.message.channel, content=str(
+                    self.voice_text['play_command_data'][7]))
+            return
+        except BotErrors.MaxPlayersError as e:
+            await self.bot.send_message(ctx.message.channel,
+                                        content=str(e))
+            return
+        await self.bot.send_message(
+            ctx.message.channel,
+            content='Added {0} songs from the playlist.'.format(added))
+
+    async def extract_info(self, query, server_id=None, timeout=None):
         """
-        Creates an instance of the VoiceChannel object
-        to use in with the Voice Commands.
-
-        This requires that voicechannelobj and textchannelobj
-        are channel objects. This means making the objects when
-        bot restarts on voice channel rejoins.
+        Gets the youtube_dl info dict for a search string or url.
 
-        :param voicechannelobj: Object to the Voice Channel
-            the VoiceChannel object is for.
-        :param textchannelobj:  Object to the Text Channel
-            the VoiceChannel object is for.
+        :param timeout: seconds to wait for the lookup budget, None to
+            wait as long as it takes.
         """
-        self.bot = bot
-        self.botvoicechannel = botvoicechannel
-        self.vchannel = voicechannelobj
-        self.voice_message_channel = textchannelobj
-        self.voice_message_server = textchannelobj.server
-        self.voice = None
-        self._sent_finished_message = False
-        self.is_bot_playing = False
-        # to replace the temp player and normal player crap soon.
-        self.player_list = []
-        # denotes if an error happened while joining the
-        # Voice Channel.
-        self.verror = False
+        if self.library is not None:
+            info = self.library.search(query)
+            if info is not None:
+                return info
+        start = time.perf_counter()
+        try:
+            return await self.resolver.resolve(query, server_id, timeout)
+        finally:
+            self.metrics.observe('resolve', time.perf_counter() - start)
 
-    async def join(self):
+    async def acquire_player(self, session, timeout=None):
         """
-        Joins the particular voice channel.
+        Gets an VoiceChannel instance a slot of the budget of
+        playing songs if it does not have one.
         """
-        if self.voice_message_server.id not in \
-                self.botvoicechannel:
-            self.botvoicechannel[
-                self.voice_message_server.id] = {}
-        if self.voice_message_channel.id not in \
-                self.botvoicechannel:
-            self.botvoicechannel[
-                self.voice_message_server.id
-            ]['text'] = self.voice_message_channel.id
-        if self.vchannel.id not in self.botvoicechannel:
-            self.botvoicechannel[
-                self.voice_message_server.id
-            ]['voice'] = self.vchannel.id
-        self.write_json()
-        self.voice = await self.bot.join_voice_channel(
-            self.vchannel)
+        if not session.has_player_slot:
+            await self.player_limiter.acquire(session.server_id, timeout)
+            session.has_player_slot = True
 
-    def write_json(self):
+    def release_player(self, session):
         """
-        writes the data to file.
+        Gives back the slot of an VoiceChannel instance once nothing
+        plays there anymore.
         """
-        file_name = os.path.join(
-            sys.path[0], 'resources', 'ConfigData',
-            'BotVoiceChannel.json')
-        json.dump(self.botvoicechannel, open(file_name, "w"))
+        if session.has_player_slot:
+            session.has_player_slot = False
+            self.player_limiter.release()
 
-    def add_player(self, player):
+    async def create_player(self, session, track, info=None, offset=0):
         """
-        Adds an player to the Voice Channel list.
+        Creates the player for an song, this is the only place
+        an ffmpeg process gets spawned for it.
 
-        Note: All finished / stopped players must
-        be removed from the list to prevent breakage
-        of this cog. To do that cache the current player
-        before starting and then when it is
-        finished / stopped remove it by calling
-        remove_player.
+        :param session: VoiceChannel instance to play in.
+        :param track: Track to play.
+        :param info: youtube_dl info dict for the song if it was
+            just extracted, otherwise it is extracted again to get
+            an fresh stream url.
+        :param offset: seconds into the song to start from.
         """
-        # cap list at 15 players per instance.
-        if len(self.player_list) < 15:
-            self.player_list.append(player)
+        after = functools.partial(self.voice_playlist, session)
+        path = self.audio_cache.get(track.key)
+        if path is not None:
+            info = self.audio_cache.get_info(track.key)
+            info['url'] = path
         else:
-            raise BotErrors.MaxPlayersError(
-                "The maximum number of players for this"
-                " Voice Channel has been reached.")
+            if info is None:
+                info = await self.extract_info(
+                    track.url, session.server_id)
+            if not info.get('is_live') and \
+                    info.get('extractor_key') != 'Local':
+                self.audio_cache.schedule(self.bot.loop, track)
+        end = None
+        if self.loudness is not None and not info.get('is_live'):
+            entry = self.loudness.get(track.key)
+            if entry is None and \
+                    not self.audio_cache.is_downloading(track.key):
+                # a song being cached is measured from its file the
+                # next time it plays instead of downloading it twice.
+                self.loudness.schedule(self.bot.loop, track, info['url'],
+                                       info.get('http_headers'))
+            elif self.settings['skip_silence'] > 0:
+                offset = offset or entry[2]
+                end = entry[3]
+        profile = self.get_profile(session)
+        before_options = self.get_before_options(
+            profile, info['url'], offset, end)
+        start = time.perf_counter()
+        player = None
+        if self.can_passthrough(session, track, info):
+            player = self.create_passthrough_player(
+                session, info['url'], info.get('http_headers'), after,
+                before_options)
+        elif self.workers is not None:
+            player = self.create_worker_player(
+                session, info['url'], info.get('http_headers'), after,
+                before_options, self.get_gain(session, track), profile)
+        elif self.warm_pool is not None and not offset and \
+                end is None and info['url'].startswith('http') and \
+                profile.get('buffer') == self.warm_buffer:
+            player = self.create_warm_player(
+                session, info['url'], info.get('http_headers'), after,
+                profile)
+        if player is None:
+            player = session.voice.create_ffmpeg_player(
+                info['url'], options=self.ffmop,
+                before_options=before_options,
+                headers=info.get('http_headers'), after=after)
+        if not getattr(player, 'passthrough', False):
+            self.apply_profile(session, profile, player)
+        if self.settings['read_ahead_seconds'] > 0 and \
+                not getattr(player, 'worker', False):
+            self.add_read_ahead(player, info.get('abr'))
+        if numpy is not None and not getattr(player, 'worker', False) \
+                and not getattr(player, 'passthrough', False):
+            player.buff = PCMMixer(player.buff)
+        self.metrics.observe('ffmpeg_spawn', time.perf_counter() - start)
+        self.supervisor.add(session.server_id, player.process)
+        # the same attributes create_ytdl_player sets.
+        player.download_url = info['url']
+        player.url = track.url
+        player.title = track.title
+        player.uploader = track.uploader
+        player.duration = info.get('duration') or track.duration
+        player.is_live = bool(info.get('is_live'))
+        player.views = info.get('view_count')
+        player.likes = info.get('like_count')
+        player.dislikes = info.get('dislike_count')
+        player.description = info.get('description')
+        player.track = track
+        player.offset = offset
+        # where the sound of the song ends, None if it is not known.
+        player.end = end
+        if not getattr(player, 'passthrough', False):
+            self.set_volume(session, player)
+        return player
 
-    def remove_player(self, player):
+    def get_gain(self, session, track):
         """
-        Adds an player to the Voice Channel list.
+        Gets the gain to play an song with, the volume of the
+        VoiceChannel instance times the gain bringing the song to the
+        loudness target.
         """
-        self.player_list.remove(player)
+        gain = session.volume
+        entry = None
+        if self.loudness is not None and \
+                self.settings['normalize_loudness']:
+            entry = self.loudness.get(track.key)
+        if entry is not None:
+            mean, peak = entry[:2]
+            # the gain never makes the loudest sample clip.
+            gain *= 10 ** (min(self.settings['loudness_target'] - mean,
+                               self.settings['loudness_max_gain'],
+                               -peak) / 20)
+        return gain
 
-    async def leave(self):
+    def set_volume(self, session, player):
         """
-        Leaves the particular voice channel.
+        Sets the gain of a player from the volume of the VoiceChannel
+        instance and the loudness of its song.
         """
-        # Hopefully this assumption is correct.
-        self.botvoicechannel.pop(
-            self.voice_message_server.id)
-        self.write_json()
-        try:
-            await self.voice.disconnect()
-        except ConnectionResetError:
-            # Supress a Error here.
-            pass
+        gain = self.get_gain(session, player.track)
+        if isinstance(getattr(player, 'buff', None), PCMMixer):
+            player.buff.gain = gain
+        elif getattr(player, 'worker', False):
+            player.packets.set_volume(gain)
+        else:
+            player.volume = min(gain, 2.0)
 
-    async def move(self, voicechannelobj):
+    def add_read_ahead(self, player, abr=None):
         """
-        Move to an particular voice channel.
+        Puts an ReadAheadBuffer between ffmpeg and a player.
 
-        :param voicechannelobj: Voice Channel
-            object to move to.
+        :param abr: kbps of the source, which sizes the buffer of
+            players sending its Opus packets as is.
         """
-        self.vchannel = voicechannelobj
-        if self.vchannel.id not in self.botvoicechannel:
-            self.botvoicechannel[
-                self.voice_message_server.id
-            ]['voice'] = self.vchannel.id
-        self.write_json()
-        await self.voice.move_to(self.vchannel)
+        bytes_per_second = PCM_BYTES_PER_SECOND
+        if getattr(player, 'passthrough', False):
+            # with some room for the Ogg pages around the packets.
+            bytes_per_second = (abr or 160) * 1000 // 8 * 5 // 4
+        buffer = ReadAheadBuffer(
+            player.process.stdout, player.process,
+            int(self.settings['read_ahead_seconds'] * bytes_per_second),
+            on_underrun=functools.partial(self.metrics.incr, 'underruns'))
+        if getattr(player, 'passthrough', False):
+            player.packets = OggOpusReader(buffer)
+        else:
+            player.buff = buffer
+        stop = player.stop
 
-    async def create_player(self, *args, **kwargs):
+        def stop_reading():
+            buffer.stop()
+            stop()
+        player.stop = stop_reading
+
+    def can_passthrough(self, session, track, info):
         """
-        Handles creating all the player stuff for me.
+        Checks if the Opus audio of a source can be sent as is.
 
-        This helps makes this class easier for the
-        rewrite to use.
+        Only 48 kHz Opus can be, and neither the volume nor the
+        loudness can be changed without decoding it, so the PCM path
+        is used when the song needs a gain. Trimmed silence does not
+        start and end on Opus packets, so it needs that path too.
         """
-        await self.add_player(
-            await self.voice.create_ytdl_player(
-                *args, **kwargs))
+        if self.loudness is not None and \
+                self.settings['skip_silence'] > 0:
+            entry = self.loudness.get(track.key)
+            if entry is not None and (entry[2] or entry[3] is not None):
+                return False
+        return (self.settings['opus_passthrough'] and
+                self.get_profile(session).get('passthrough') and
+                abs(self.get_gain(session, track) - 1.0) < 0.01 and
+                info.get('acodec') == 'opus' and
+                info.get('asr') in (48000, None))
 
+    @staticmethod
+    def get_input_args(source, headers, before_options):
+        """
+        Gets the ffmpeg arguments up to and including the input.
+        """
+        args = ['ffmpeg']
+        if isinstance(headers, dict):
+            args.extend(['-headers', ''.join(
+                '{0}: {1}\r\n'.format(key, value)
+                for key, value in headers.items())])
+        if before_options:
+            args.extend(shlex.split(before_options))
+        args.extend(['-i', source])
+        return args
 
-class Voice:
-    """
-    Voice Channel Commands class for DecoraterBot.
-    """
-    def __init__(self, bot):
-        self.bot = bot
-        self.botvoicechannel = PluginConfigReader(
-            file='BotVoiceChannel.json')
-        # this will remain the same.
-        self.ytdlo = {
-            'verbose': False,
-            'logger': YTDLLogger(self.bot),
-            'default_search': "ytsearch"
-        }
-        # list of VoiceChannel class instances to keep track of them all.
-        self.voiceobjs = []
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.player = None
-        # deprecated, see VoiceChannel.vchannel instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.vchannel = None
-        # deprecated, see VoiceChannel.vchannel instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.vchannel_name = None
-        # deprecated, see VoiceChannel.voice_message_channel
-        # instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.voice_message_channel = None
-        # deprecated, see VoiceChannel.voice_message_server
-        # instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.voice_message_server = None
-        # deprecated, see VoiceChannel.voice_message_server
-        # instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.voice_message_server_name = None
-        # deprecated, see VoiceChannel.voice instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.voice = None
-        # deprecated, see VoiceChannel._sent_finished_message
-        # instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._sent_finished_message = False
-        # deprecated, see VoiceChannel.is_bot_playing instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.is_bot_playing = False
-        # deprecated, see VoiceChannel.bot_playlist instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.bot_playlist = []
-        # deprecated, see VoiceChannel.bot_playlist_entries
-        # instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.bot_playlist_entries = []
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_1 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_2 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_3 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_4 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_5 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_6 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_7 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_8 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_9 = None
-        # deprecated, see VoiceChannel.player_list instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self._temp_player_10 = None
-        # this will remain the same.
-        self.ffmop = "-nostats -loglevel quiet"
-        # deprecated, see VoiceChannel.verror instead.
-        # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-        self.verror = False
-        # Global bool to prevent the bot from being able to join a voice channel
-        # while logging in. This is Essentially a fix to the bot not being able
-        # to actually send messages in the voice commands as they would
-        # drastically screw up.
-        self.lock_join_voice_channel_command = False
-        # For loading Voice Channel message data.
-        self.voice_text = PluginTextReader(
-            file='voice.json')
-        self.resolve_send_message_error = (
-            self.bot.BotPMError.resolve_send_message_error)
-        self.rsme = self.resolve_send_message_error
+    def create_warm_player(self, session, source, headers, after,
+                           profile):
+        """
+        Makes the player for an song from a ffmpeg process of the
+        warm pool.
 
-    def setup(self):
+        :return: The player, or None when no process was ready.
         """
-        Allows bot to rejoin voice channel when reloading.
+        process = self.warm_pool.take()
+        if process is None:
+            return None
+        self.warm_pool.feed(process, source, headers,
+                            bool(profile.get('reconnect')))
+        return discord.voice_client.ProcessPlayer(
+            process, session.voice, after)
+
+    def create_worker_player(self, session, source, headers, after,
+                             before_options, gain, profile):
         """
-        self.bot.loop.create_task(self.__load())
+        Hands an song to a voice worker process and makes an
+        WorkerPlayer sending the packets it encodes.
 
-    # will be revised on next release of this cog!!!
+        :return: The player, or None when every worker died.
+        """
+        args = self.get_input_args(source, headers, before_options)
+        args.extend(['-f', 's16le', '-ar', '48000', '-ac', '2'])
+        args.extend(shlex.split(self.ffmop))
+        args.append('pipe:1')
+        # packets of 20 ms the worker may send ahead of the player.
+        ahead = max(50, int(self.settings['read_ahead_seconds'] * 50))
+        stream = self.workers.open(args, gain,
+                                   profile['bitrate'], ahead)
+        if stream is None:
+            return None
+        return WorkerPlayer(stream, session.voice, after)
 
-    async def __load(self):
+    def create_passthrough_player(self, session, source, headers, after,
+                                  before_options=None):
         """
-        Makes bot able to join a voice channel when the commands are loaded.
+        Spawns ffmpeg copying the Opus audio of a source into an
+        Ogg stream and makes an OpusPassthroughPlayer reading it.
         """
+        args = self.get_input_args(source, headers, before_options)
+        args.extend(['-vn', '-c:a', 'copy', '-f', 'opus'])
+        args.extend(shlex.split(self.ffmop))
+        args.append('pipe:1')
         try:
-            vchannel_2 = str(
-                self.botvoicechannel['Bot_Current_Voice_Channel'][0])
-            vmserver = str(
-                self.botvoicechannel['Bot_Current_Voice_Channel'][1])
-            vmchannel = str(
-                self.botvoicechannel['Bot_Current_Voice_Channel'][2])
-            self.voice_message_server_name = str(
-                self.botvoicechannel['Bot_Current_Voice_Channel'][3])
-            self.vchannel_name = str(
-                self.botvoicechannel['Bot_Current_Voice_Channel'][4])
-            self.vchannel = discord.Object(id=vchannel_2)
-            self.voice_message_server = discord.Object(id=vmserver)
-            self.voice_message_channel = discord.Object(id=vmchannel)
-            try:
-                self.voice = await self.bot.join_voice_channel(self.vchannel)
-                self.verror = False
-            except discord.ConnectionClosed:
-                pass
-            except discord.InvalidArgument:
-                self.voice_message_server_name = None
-                self.vchannel_name = None
-                self.vchannel = None
-                self.voice_message_server = None
-                self.voice_message_channel = None
-                self.voice = None
-                self.verror = True
-            except BotErrors.CommandTimeoutError:
-                await self.bot.send_message(self.voice_message_channel,
-                                            content=str(
-                                                self.voice_text[
-                                                    'reload_commands_vo'
-                                                    'ice_channels_bypass2'][
-                                                    0]))
-                self.voice_message_server_name = None
-                self.vchannel_name = None
-                self.vchannel = None
-                self.voice_message_server = None
-                self.voice_message_channel = None
-                self.voice = None
-                self.verror = True
-            except RuntimeError:
-                self.voice_message_server_name = None
-                self.vchannel_name = None
-                self.vchannel = None
-                self.voice_message_server = None
-                self.voice = None
-                self.verror = True
-                msgdata = str(self.voice_text[
-                                  'reload_commands_voice_channels_bypass2'][1])
-                await self.bot.send_message(self.voice_message_channel,
-                                            content=msgdata)
-                self.voice_message_channel = None
-            if self.verror is not True:
-                message_data = str(
-                    self.voice_text[
-                        'reload_commands_voice_channels_bypass2'
-                    ][2]).format(self.vchannel_name)
-                await self.bot.send_message(self.voice_message_channel,
-                                            content=message_data)
-        except IndexError:
-            self.voice_message_server_name = None
-            self.vchannel_name = None
-            self.vchannel = None
-            self.voice_message_server = None
-            self.voice_message_channel = None
-            self.voice = None
-        except discord.ClientException:
-            # already in a voice channel so lots not set those
-            # values to None.
-            pass
+            process = subprocess.Popen(
+                args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            raise discord.ClientException(
+                'ffmpeg was not found in your PATH environment variable')
+        return OpusPassthroughPlayer(process, session.voice, after)
 
-    def __unload(self):
+    def get_profile(self, session):
         """
-        Makes bot able to leave Voice channel when reloading or unloading
-        voice commands.
+        Gets the encoding profile of an VoiceChannel instance.
         """
-        self.bot.loop.create_task(self.__reload())
+        profiles = self.settings['encoding_profiles']
+        return profiles.get(session.profile or
+                            self.settings['encoding_profile'],
+                            DEFAULT_VOICE_SETTINGS['encoding_profiles'][
+                                'high'])
 
-    # will be revised on next release of this cog!!!
+    @staticmethod
+    def get_before_options(profile, source, offset=0, end=None):
+        """
+        Gets the ffmpeg options for the input of an song.
 
-    async def __reload(self):
+        :param offset: seconds into the song to start from.
+        :param end: seconds into the song to stop at, None to play it
+            to the end.
         """
-        Makes bot able to leave Voice channel when reloading or unloading
-        voice commands.
+        options = []
+        if profile.get('reconnect') and source.startswith('http'):
+            options.append(
+                '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5')
+        if profile.get('buffer'):
+            options.append('-thread_queue_size {0}'.format(
+                profile['buffer']))
+        if offset:
+            options.append('-ss {0}'.format(offset))
+        if end is not None and end > offset:
+            options.append('-t {0:.2f}'.format(end - offset))
+        return ' '.join(options) or None
+
+    @staticmethod
+    def apply_profile(session, profile, player=None):
+        """
+        Sets the bitrate and bandwidth of the Opus encoder of an
+        VoiceChannel instance.
+
+        :param player: Player whose voice worker gets the bitrate too.
+        """
+        encoder = session.voice.encoder
+        encoder.set_bitrate(profile['bitrate'])
+        encoder.set_bandwidth(profile['bandwidth'])
+        if getattr(player, 'worker', False):
+            player.packets.set_bitrate(profile['bitrate'])
+
+    def load_clips(self):
+        """
+        Decodes the sound effects in the sfx folder to PCM held in
+        memory. This blocks so run it in an executor.
         """
+        folder = self.settings['sfx_dir']
+        max_bytes = int(self.settings['sfx_max_seconds'] *
+                        PCM_BYTES_PER_SECOND)
         try:
-            if self.voice is not None:
-                await self.voice.disconnect()
-                if self.voice_message_channel is not None:
-                    try:
-                        reason = str(
-                            self.voice_text[
-                                'reload_commands_voice_channels_bypass1'
-                            ][1])
-                        try:
-                            message_data = str(
-                                self.voice_text[
-                                    'reload_commands_voice_channels_bypass1'][
-                                    0]).format(
-                                self.vchannel.name, reason)
-                        except AttributeError:
-                            message_data = str(
-                                self.voice_text[
-                                    'reload_commands_voice_channels_bypass1'][
-                                    0]).format(
-                                self.vchannel_name, reason)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                        self.voice_message_channel = None
-                        self.voice = None
-                        self.vchannel = None
-                        self.voice_message_server = None
-                        self.player = None
-                        self.vchannel_name = None
-                        self._sent_finished_message = False
-                        self.voice_message_server_name = None
-                        self.is_bot_playing = False
-                    except discord.Forbidden:
-                        pass
-        except Exception as e:
-            str(e)
+            names = sorted(os.listdir(folder))
+        except OSError:
             return
+        for name in names:
+            try:
+                output = subprocess.run(
+                    ['ffmpeg', '-i', os.path.join(folder, name), '-f',
+                     's16le', '-ar', '48000', '-ac', '2'] +
+                    shlex.split(self.ffmop) + ['pipe:1'],
+                    stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                    timeout=30).stdout[:max_bytes]
+            except (OSError, subprocess.TimeoutExpired):
+                continue
+            if output:
+                self.clips[os.path.splitext(name)[0].lower()] = \
+                    numpy.frombuffer(output[:len(output) // 4 * 4],
+                                     dtype=numpy.int16)
 
-    # deprecated, see VoiceChannel.player_list.
-    # WILL BE REMOVED ON NEXT RELEASE OF THIS COG!!!
-
-    def resolve_bot_playlist_issue(self):
-        """
-        This should fix the Memory leaks of ffmpeg processes from the temp
-        players when a song stops playing.
-        """
-        if self.is_bot_playing is False:
-            if self._temp_player_1 is not None:
-                self._temp_player_1.start()
-                self._temp_player_1.stop()
-                self._temp_player_1 = None
-            if self._temp_player_2 is not None:
-                self._temp_player_2.start()
-                self._temp_player_2.stop()
-                self._temp_player_2 = None
-            if self._temp_player_3 is not None:
-                self._temp_player_3.start()
-                self._temp_player_3.stop()
-                self._temp_player_3 = None
-            if self._temp_player_4 is not None:
-                self._temp_player_4.start()
-                self._temp_player_4.stop()
-                self._temp_player_4 = None
-            if self._temp_player_5 is not None:
-                self._temp_player_5.start()
-                self._temp_player_5.stop()
-                self._temp_player_5 = None
-            if self._temp_player_6 is not None:
-                self._temp_player_6.start()
-                self._temp_player_6.stop()
-                self._temp_player_6 = None
-            if self._temp_player_7 is not None:
-                self._temp_player_7.start()
-                self._temp_player_7.stop()
-                self._temp_player_7 = None
-            if self._temp_player_8 is not None:
-                self._temp_player_8.start()
-                self._temp_player_8.stop()
-                self._temp_player_8 = None
-            if self._temp_player_9 is not None:
-                self._temp_player_9.start()
-                self._temp_player_9.stop()
-                self._temp_player_9 = None
-            if self._temp_player_10 is not None:
-                self._temp_player_10.start()
-                self._temp_player_10.stop()
-                self._temp_player_10 = None
-
-    # will be revised on next release of this cog!!!
-
-    async def on_ready(self):
+    async def save_playlists(self):
         """
-        When Bot is ready.
+        Saves the playlists and song positions of every Voice Channel
+        to BotVoiceChannel.json every playlist_save_interval seconds
+        while something plays, so they can be resumed after a crash.
+        The file is written off the event loop.
         """
-        if self.bot.initial_rejoin_voice_channel:
-            self.bot.initial_rejoin_voice_channel = False
-            self.lock_join_voice_channel_command = True
+        while True:
+            await asyncio.sleep(self.settings['playlist_save_interval'])
+            sessions = list(self.voiceobjs.values())
+            if not self.playlists_changed and not any(
+                    session.is_bot_playing for session in sessions):
+                continue
+            self.playlists_changed = False
+            for session in sessions:
+                session.save_playlist(write=False)
+            data = json.dumps(self.botvoicechannel)
             try:
-                vchannel_2 = str(
-                    self.botvoicechannel['Bot_Current_Voice_Channel'][0])
-                vmserver = str(
-                    self.botvoicechannel['Bot_Current_Voice_Channel'][1])
-                vmchannel = str(
-                    self.botvoicechannel['Bot_Current_Voice_Channel'][2])
-                self.voice_message_server_name = str(
-                    self.botvoicechannel['Bot_Current_Voice_Channel'][3])
-                self.vchannel_name = str(
-                    self.botvoicechannel['Bot_Current_Voice_Channel'][4])
-                self.vchannel = discord.Object(id=vchannel_2)
-                self.voice_message_server = discord.Object(id=vmserver)
-                self.voice_message_channel = discord.Object(id=vmchannel)
-                try:
-                    self.voice = await self.bot.join_voice_channel(
-                        self.vchannel)
-                    self.verror = False
-                except discord.ConnectionClosed:
-                    pass
-                except BotErrors.CommandTimeoutError:
-                    self.voice_message_server_name = None
-                    self.vchannel_name = None
-                    self.vchannel = None
-                    self.voice_message_server = None
-                    self.voice_message_channel = None
-                    self.voice = None
-                    self.verror = True
-                    self.lock_join_voice_channel_command = False
-                except discord.InvalidArgument:
-                    self.voice_message_server_name = None
-                    self.vchannel_name = None
-                    self.vchannel = None
-                    self.voice_message_server = None
-                    self.voice_message_channel = None
-                    self.voice = None
-                    self.verror = True
-                    self.lock_join_voice_channel_command = False
-                except RuntimeError:
-                    self.voice_message_server_name = None
-                    self.vchannel_name = None
-                    self.vchannel = None
-                    self.voice_message_server = None
-                    self.voice_message_channel = None
-                    self.voice = None
-                    self.verror = True
-                    self.lock_join_voice_channel_command = False
-                    msgdata = str(
-                        self.voice_text[
-                            'reload_commands_voice_channels_bypass2'
-                        ][1])
-                    await self.bot.send_message(self.voice_message_channel,
-                                                content=msgdata)
-                if self.verror is not True:
-                    message_data = str(
-                        self.voice_text[
-                            'reload_commands_voice_channels_bypass2'
-                        ][2]).format(self.vchannel_name)
-                    await self.bot.send_message(self.voice_message_channel,
-                                                content=message_data)
-                    self.lock_join_voice_channel_command = False
-            except IndexError:
-                self.voice_message_server_name = None
-                self.vchannel_name = None
-                self.vchannel = None
-                self.voice_message_server = None
-                self.voice_message_channel = None
-                self.voice = None
-                self.lock_join_voice_channel_command = False
+                await self.bot.loop.run_in_executor(
+                    None, self.write_voice_channel_file, data)
+            except OSError:
+                pass
 
-    # will be revised on next release of this cog!!!
+    @staticmethod
+    def write_voice_channel_file(data):
+        """
+        Writes BotVoiceChannel.json. This blocks so run it in an
+        executor.
+        """
+        with open(get_voice_channel_file(), 'w') as data_file:
+            data_file.write(data)
 
-    @commands.command(name='JoinVoiceChannel', pass_context=True, no_pm=True)
-    async def join_voice_channel_command(self, ctx):
+    async def prewarm_history(self):
         """
-        Bot Voice Command.
-        :param ctx: Command Context.
+        Looks up the songs played the most in every server so they
+        are in the caches before they are asked for again.
         """
-        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
-            return
-        if ctx.message.author.id in self.bot.banlist['Users']:
-            return
-        elif self.vchannel is not None:
-            try:
-                messagedata = str(
-                    self.voice_text['join_voice_channel_command_data'][0])
+        for server_id in self.history.servers():
+            for track, plays, played in self.history.top(
+                    server_id, self.settings['history_prewarm']):
                 try:
-                    message_data = messagedata.format(
-                        self.voice_message_server.name)
-                except AttributeError:
-                    message_data = messagedata.format(
-                        self.voice_message_server_name)
-                await self.bot.send_message(ctx.message.channel,
-                                            content=message_data)
-            except discord.Forbidden:
-                await self.bot.BotPMError.resolve_send_message_error(self.bot,
-                                                                     ctx)
-        else:
-            if not self.lock_join_voice_channel_command:
-                self.voice_message_channel = ctx.message.channel
-                self.voice_message_server = ctx.message.channel.server
-                self.voice_message_server_name = (
-                    ctx.message.channel.server.name)
-                if ctx.message.author.voice_channel is not None:
-                    self.vchannel = ctx.message.author.voice_channel
-                    self.vchannel_name = ctx.message.author.voice_channel.name
-                    if self.vchannel.id not in self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.vchannel.id)
-                    if self.voice_message_server.id not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_server.id)
-                    if self.voice_message_channel.id not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_channel.id)
-                    if self.voice_message_server_name not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_server_name)
-                    if self.vchannel_name not in self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.vchannel_name)
-                    file_name = os.path.join(
-                        sys.path[0], 'resources', 'ConfigData',
-                       'BotVoiceChannel.json')
-                    json.dump(self.botvoicechannel, open(file_name, "w"))
-                    try:
-                        try:
-                            self.voice = await self.bot.join_voice_channel(
-                                self.vchannel)
-                        except discord.ConnectionClosed:
-                            pass
-                        except RuntimeError:
-                            self.voice_message_server_name = None
-                            self.vchannel_name = None
-                            self.vchannel = None
-                            self.voice_message_server = None
-                            self.voice_message_channel = None
-                            self.voice = None
-                            self.verror = True
-                            msgdata = str(
-                                self.voice_text[
-                                    'join_voice_channel_command_data'
-                                ][6])
-                            await self.bot.send_message(
-                                self.voice_message_channel, content=msgdata)
-                        if not self.verror:
-                            try:
-                                msg_data = str(
-                                    self.voice_text[
-                                        'join_voice_channel_command_data'
-                                    ][1]).format(self.vchannel_name)
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=msg_data)
-                            except discord.Forbidden:
-                                await self.resolve_send_message_error(
-                                    self.bot, ctx)
-                    except discord.InvalidArgument:
-                        self.voice_message_channel = None
-                        self.voice = None
-                        self.vchannel = None
-                        self.voice_message_server = None
-                        self.voice_message_server_name = None
-                        self.vchannel_name = None
-                        try:
-                            msg_data = str(
-                                self.voice_text[
-                                    'join_voice_channel_command_data'
-                                ][2])
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=msg_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                    except BotErrors.CommandTimeoutError:
-                        self.voice_message_channel = None
-                        self.voice = None
-                        self.vchannel = None
-                        self.voice_message_server = None
-                        self.voice_message_server_name = None
-                        self.vchannel_name = None
-                        try:
-                            msg_data = str(
-                                self.voice_text[
-                                    'join_voice_channel_command_data'
-                                ][3])
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=msg_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                        self.verror = True
-                    except discord.HTTPException:
-                        self.voice_message_channel = None
-                        self.voice = None
-                        self.vchannel = None
-                        self.voice_message_server = None
-                        try:
-                            msg_data = str(
-                                self.voice_text[
-                                    'join_voice_channel_command_data'
-                                ][4])
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=msg_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                    except discord.opus.OpusNotLoaded:
-                        self.voice_message_channel = None
-                        self.voice = None
-                        self.vchannel = None
-                        self.voice_message_server = None
-                        self.voice_message_server_name = None
-                        self.vchannel_name = None
-                        try:
-                            msg_data = str(
-                                self.voice_text[
-                                    'join_voice_channel_command_data'
-                                ][5])
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=msg_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                    except IndexError:
-                        return
+                    info = await self.extract_info(track.url, server_id)
+                except (youtube_dl.utils.UnsupportedError,
+                        youtube_dl.utils.ExtractorError,
+                        youtube_dl.utils.DownloadError):
+                    continue
+                if not info.get('is_live') and \
+                        info.get('extractor_key') != 'Local':
+                    self.audio_cache.schedule(self.bot.loop, track)
 
-    # will be revised on next release of this cog!!!
+    def record_play(self, session, track):
+        """
+        Adds an song played in a VoiceChannel instance to the history
+        of its server.
+        """
+        if self.history is not None:
+            self.history.add(session.server_id, track)
 
-    @commands.command(name='play', pass_context=True, no_pm=True)
-    async def play_command(self, ctx):
+    async def scan_library(self):
         """
-        Bot Voice Command.
-        :param ctx: Command Context.
+        Keeps the index of the local music folder up to date.
         """
-        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
-            return
-        if ctx.message.author.id in self.bot.banlist['Users']:
+        while True:
+            await self.bot.loop.run_in_executor(None, self.library.scan)
+            await asyncio.sleep(self.settings['library_rescan_interval'])
+
+    async def watch_player_lag(self):
+        """
+        Switches Voice Channels whose player falls behind to the
+        fallback of their encoding profile.
+        """
+        while True:
+            await asyncio.sleep(self.settings['lag_check_interval'])
+            step_down_lag = self.settings['step_down_lag']
+            if not step_down_lag:
+                continue
+            for session in list(self.voiceobjs.values()):
+                player = session.player
+                if player is None or \
+                        get_player_lag(player) < step_down_lag:
+                    continue
+                fallback = self.get_profile(session).get('fallback')
+                if fallback not in self.settings['encoding_profiles']:
+                    continue
+                session.profile = fallback
+                if not getattr(player, 'passthrough', False):
+                    self.apply_profile(
+                        session, self.get_profile(session), player)
+                try:
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content='Playback is falling behind, switched to '
+                                'the {0} quality.'.format(fallback))
+                except discord.HTTPException:
+                    pass
+
+    async def start_track(self, session, track, info=None,
+                          requested=None, offset=0, timeout=None,
+                          announce=True):
+        """
+        Starts playing an song in a Voice Channel.
+
+        :param requested: perf_counter time the song was asked for.
+        :param offset: seconds into the song to start from.
+        :param timeout: seconds to wait for the budget of playing
+            songs, None to wait as long as it takes.
+        :param announce: sends the now playing message if True.
+        """
+        if requested is None:
+            requested = time.perf_counter()
+        session.starting = True
+        try:
+            await self.acquire_player(session, timeout)
+            session._sent_finished_message = False
+            try:
+                session.player = await self.create_player(
+                    session, track, info, offset)
+            except Exception:
+                self.release_player(session)
+                raise
+        finally:
+            session.starting = False
+        session.is_bot_playing = True
+        self.playlists_changed = True
+        self.metrics.watch_first_frame(session.player, requested)
+        session.player.start()
+        self.schedule_prefetch(session)
+        if not offset:
+            # a song resumed after a reload was already counted.
+            self.record_play(session, track)
+        if not announce:
             return
-        elif self.is_bot_playing is False:
-            if self.voice is not None:
-                if self.voice_message_channel is not None:
-                    if ctx.message.channel.id == self.voice_message_channel.id:
-                        try:
-                            data = ctx.message.content[
-                                   len(ctx.prefix + "play "):].strip()
-                            if data == "":
-                                try:
-                                    message_data = str(
-                                        self.voice_text[
-                                            'play_command_data'
-                                        ][0])
-                                    await self.bot.send_message(
-                                        self.voice_message_channel,
+        minutes, seconds = split_duration(track.duration)
+        try:
+            message_data = str(
+                self.voice_text['play_command_data'][1]).format(
+                str(track.title), str(track.uploader),
+                minutes, seconds)
+            await self.bot.send_message(session.voice_message_channel,
                                         content=message_data)
-                                except discord.Forbidden:
-                                    await self.resolve_send_message_error(
-                                        self.bot, ctx.message)
-                            if data.rfind('https://') == -1 and data.rfind(
-                                    'http://') == -1:
-                                # lets try to do a search.
-                                self.player = (
-                                    await self.voice.create_ytdl_player(
-                                        data, ytdl_options=self.ytdlo,
-                                        options=self.ffmop,
-                                        after=self.voice_playlist))
-                                self._sent_finished_message = False
-                                self.is_bot_playing = True
-                                if self.player is not None:
-                                    try:
-                                        fulldir = self.player.duration
-                                        minutes = str(int((fulldir / 60) % 60))
-                                        seconds = str(int(fulldir % 60))
-                                        if len(seconds) == 1:
-                                            seconds = "0" + seconds
-                                        try:
-                                            message_data = str(
-                                                self.voice_text[
-                                                    'play_command_data'][
-                                                    1]).format(
-                                                str(self.player.title),
-                                                str(self.player.uploader),
-                                                minutes, seconds)
-                                            await self.bot.send_message(
-                                                self.voice_message_channel,
-                                                content=message_data)
-                                        except discord.Forbidden:
-                                            await (
-                                                (self
-                                                 ).resolve_send_message_error(
-                                                    self.bot,
-                                                    ctx.message))
-                                        try:
-                                            self.player.start()
-                                        except RuntimeError:
-                                            pass
-                                    except AttributeError:
-                                        message_data = str(
-                                            self.voice_text[
-                                                'play_command_data'][2])
-                                        self.is_bot_playing = False
-                                        await self.bot.send_message(
-                                            self.voice_message_channel,
-                                            content=message_data)
-                            else:
-                                if '<' and '>' in data:
-                                    data = data.strip('<')
-                                    data = data.strip('>')
-                                if 'www.youtube.com/watch?v=' in data or \
-                                        'soundcloud.com' in data:
-                                    self.player = (
-                                        await self.voice.create_ytdl_player(
-                                            data,
-                                            ytdl_options=self.ytdlo,
-                                            options=self.ffmop,
-                                            after=self.voice_playlist))
-                                    self._sent_finished_message = False
-                                    self.is_bot_playing = True
-                                    if self.player is not None:
-                                        try:
-                                            fulldir = self.player.duration
-                                            minutes = str(
-                                                int((fulldir / 60) % 60))
-                                            seconds = str(int(fulldir % 60))
-                                            if len(seconds) == 1:
-                                                seconds = "0" + seconds
-                                            try:
-                                                message_data = str(
-                                                    self.voice_text[
-                                                        'play_command_data'][
-                                                        1]).format(
-                                                    str(self.player.title),
-                                                    str(self.player.uploader),
-                                                    minutes,
-                                                    seconds)
-                                                await self.bot.send_message(
-                                                    self.voice_message_channel,
-                                                    content=message_data)
-                                            except discord.Forbidden:
-                                                await self.rsme(self.bot, ctx)
-                                            try:
-                                                self.player.start()
-                                            except RuntimeError:
-                                                pass
-                                        except AttributeError:
-                                            message_data = str(
-                                                self.voice_text[
-                                                    'play_command_data'][2])
-                                            self.is_bot_playing = False
-                                            await self.bot.send_message(
-                                                self.voice_message_channel,
-                                                content=message_data)
-                        except IndexError:
-                            return
-                        except discord.HTTPException:
-                            message_data = str(
-                                self.voice_text['play_command_data'][
-                                    4]).format(str(sys.path))
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
-                            self.player = None
-                        except youtube_dl.utils.UnsupportedError:
-                            await self.bot.send_message(
-                                ctx.message.channel, content=str(
-                                    self.voice_text[
-                                        'play_command_data'
-                                    ][5]))
-                            self.player = None
-                        except youtube_dl.utils.ExtractorError:
-                            message_data = str(
-                                self.voice_text['play_command_data'][6])
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
-                            self.player = None
-                        except youtube_dl.utils.DownloadError:
-                            await self.bot.send_message(
-                                ctx.message.channel, content=str(
-                                    self.voice_text[
-                                        'play_command_data'
-                                    ][7]))
-                            self.player = None
-                    else:
-                        return
-            else:
-                message_data = str(
-                    self.voice_text['play_command_data'][8])
-                await self.bot.send_message(ctx.message.channel,
-                                            content=message_data)
-        else:
-            if self.player is not None:
-                data = ctx.message.content[
-                       len(ctx.prefix + "play "):].strip()
-                if data == "":
-                    try:
-                        message_data = str(
-                            self.voice_text['play_command_data'][9])
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-                else:
-                    if '<' and '>' in data:
-                        data = data.replace('<', '').replace('>', '')
-                    if data.rfind('https://') == -1 and data.rfind(
-                            'http://') == -1:
-                        if len(self.bot_playlist) == 0:
-                            self._temp_player_1 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist01 = self._temp_player_1.title
-                                playlist01time = self._temp_player_1.duration
-                                track1 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist01)
-                                fulldir = playlist01time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track1time = newdir
-                                track1uploader = str(
-                                    self._temp_player_1.uploader)
-                                track1info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track1,
-                                                    track1uploader,
-                                                    track1time)
-                                self.bot_playlist_entries.append(track1info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track1, track1time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif data in self.bot_playlist:
-                            msgdata = str(
-                                self.voice_text['play_command_data'][14])
-                            message_data = msgdata
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
-                        elif len(self.bot_playlist) == 1:
-                            self._temp_player_2 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist02 = self._temp_player_2.title
-                                playlist02time = self._temp_player_2.duration
-                                track2 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist02)
-                                fulldir = playlist02time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track2time = newdir
-                                track2uploader = str(
-                                    self._temp_player_2.uploader)
-                                track2info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track2,
-                                                    track2uploader,
-                                                    track2time)
-                                self.bot_playlist_entries.append(track2info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track2, track2time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 2:
-                            self._temp_player_3 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist03 = self._temp_player_3.title
-                                playlist03time = self._temp_player_3.duration
-                                track3 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist03)
-                                fulldir = playlist03time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track3time = newdir
-                                track3uploader = str(
-                                    self._temp_player_3.uploader)
-                                track3info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track3,
-                                                    track3uploader,
-                                                    track3time)
-                                self.bot_playlist_entries.append(track3info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track3, track3time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 3:
-                            self._temp_player_4 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist04 = self._temp_player_4.title
-                                playlist04time = self._temp_player_4.duration
-                                track4 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist04)
-                                fulldir = playlist04time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track4time = newdir
-                                track4uploader = str(
-                                    self._temp_player_4.uploader)
-                                track4info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track4,
-                                                    track4uploader,
-                                                    track4time)
-                                self.bot_playlist_entries.append(track4info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track4, track4time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 4:
-                            self._temp_player_5 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist05 = self._temp_player_5.title
-                                playlist05time = self._temp_player_5.duration
-                                track5 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist05)
-                                fulldir = playlist05time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track5time = newdir
-                                track5uploader = str(
-                                    self._temp_player_5.uploader)
-                                track5info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track5,
-                                                    track5uploader,
-                                                    track5time)
-                                self.bot_playlist_entries.append(track5info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track5, track5time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 5:
-                            self._temp_player_6 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist06 = self._temp_player_6.title
-                                playlist06time = self._temp_player_6.duration
-                                track6 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist06)
-                                fulldir = playlist06time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track6time = newdir
-                                track6uploader = str(
-                                    self._temp_player_6.uploader)
-                                track6info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track6,
-                                                    track6uploader,
-                                                    track6time)
-                                self.bot_playlist_entries.append(track6info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track6, track6time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 6:
-                            self._temp_player_7 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist07 = self._temp_player_7.title
-                                playlist07time = self._temp_player_7.duration
-                                track7 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist07)
-                                fulldir = playlist07time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track7time = newdir
-                                track7uploader = str(
-                                    self._temp_player_7.uploader)
-                                track7info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track7,
-                                                    track7uploader,
-                                                    track7time)
-                                self.bot_playlist_entries.append(track7info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track7, track7time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 7:
-                            self._temp_player_8 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist08 = self._temp_player_8.title
-                                playlist08time = self._temp_player_8.duration
-                                track8 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist08)
-                                fulldir = playlist08time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track8time = newdir
-                                track8uploader = str(
-                                    self._temp_player_8.uploader)
-                                track8info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track8,
-                                                    track8uploader,
-                                                    track8time)
-                                self.bot_playlist_entries.append(track8info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track8, track8time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 8:
-                            self._temp_player_9 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist09 = self._temp_player_9.title
-                                playlist09time = self._temp_player_9.duration
-                                track9 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist09)
-                                fulldir = playlist09time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track9time = newdir
-                                track9uploader = str(
-                                    self._temp_player_9.uploader)
-                                track9info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track9,
-                                                    track9uploader,
-                                                    track9time)
-                                self.bot_playlist_entries.append(track9info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track9, track9time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 9:
-                            self._temp_player_10 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist10 = self._temp_player_10.title
-                                playlist10time = self._temp_player_10.duration
-                                track10 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist10)
-                                fulldir = playlist10time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track10time = newdir
-                                track10uploader = str(
-                                    self._temp_player_10.uploader)
-                                track10info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track10,
-                                                    track10uploader,
-                                                    track10time)
-                                self.bot_playlist_entries.append(track10info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track10,
-                                                    track10time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 10:
-                            msgdata = str(
-                                self.voice_text['play_command_data'][15])
-                            message_data = msgdata
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
-                    if 'www.youtube.com/watch?v=' in data or \
-                            'soundcloud.com' in data:
-                        if len(self.bot_playlist) == 0:
-                            self._temp_player_1 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist01 = self._temp_player_1.title
-                                playlist01time = self._temp_player_1.duration
-                                track1 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist01)
-                                fulldir = playlist01time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track1time = newdir
-                                track1uploader = str(
-                                    self._temp_player_1.uploader)
-                                track1info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track1,
-                                                    track1uploader,
-                                                    track1time)
-                                self.bot_playlist_entries.append(track1info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track1, track1time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif data in self.bot_playlist:
-                            msgdata = str(
-                                self.voice_text['play_command_data'][14])
-                            message_data = msgdata
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
-                        elif len(self.bot_playlist) == 1:
-                            self._temp_player_2 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist02 = self._temp_player_2.title
-                                playlist02time = self._temp_player_2.duration
-                                track2 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist02)
-                                fulldir = playlist02time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track2time = newdir
-                                track2uploader = str(
-                                    self._temp_player_2.uploader)
-                                track2info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track2,
-                                                    track2uploader,
-                                                    track2time)
-                                self.bot_playlist_entries.append(track2info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track2, track2time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 2:
-                            self._temp_player_3 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist03 = self._temp_player_3.title
-                                playlist03time = self._temp_player_3.duration
-                                track3 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist03)
-                                fulldir = playlist03time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track3time = newdir
-                                track3uploader = str(
-                                    self._temp_player_3.uploader)
-                                track3info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track3,
-                                                    track3uploader,
-                                                    track3time)
-                                self.bot_playlist_entries.append(track3info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track3, track3time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 3:
-                            self._temp_player_4 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist04 = self._temp_player_4.title
-                                playlist04time = self._temp_player_4.duration
-                                track4 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist04)
-                                fulldir = playlist04time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track4time = newdir
-                                track4uploader = str(
-                                    self._temp_player_4.uploader)
-                                track4info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track4,
-                                                    track4uploader,
-                                                    track4time)
-                                self.bot_playlist_entries.append(track4info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track4, track4time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 4:
-                            self._temp_player_5 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist05 = self._temp_player_5.title
-                                playlist05time = self._temp_player_5.duration
-                                track5 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist05)
-                                fulldir = playlist05time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track5time = newdir
-                                track5uploader = str(
-                                    self._temp_player_5.uploader)
-                                track5info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track5,
-                                                    track5uploader,
-                                                    track5time)
-                                self.bot_playlist_entries.append(track5info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track5, track5time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 5:
-                            self._temp_player_6 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist06 = self._temp_player_6.title
-                                playlist06time = self._temp_player_6.duration
-                                track6 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist06)
-                                fulldir = playlist06time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track6time = newdir
-                                track6uploader = str(
-                                    self._temp_player_6.uploader)
-                                track6info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track6,
-                                                    track6uploader,
-                                                    track6time)
-                                self.bot_playlist_entries.append(track6info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track6, track6time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 6:
-                            self._temp_player_7 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist07 = self._temp_player_7.title
-                                playlist07time = self._temp_player_7.duration
-                                track7 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist07)
-                                fulldir = playlist07time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track7time = newdir
-                                track7uploader = str(
-                                    self._temp_player_7.uploader)
-                                track7info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track7,
-                                                    track7uploader,
-                                                    track7time)
-                                self.bot_playlist_entries.append(track7info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track7, track7time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 7:
-                            self._temp_player_8 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist08 = self._temp_player_8.title
-                                playlist08time = self._temp_player_8.duration
-                                track8 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist08)
-                                fulldir = playlist08time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track8time = newdir
-                                track8uploader = str(
-                                    self._temp_player_8.uploader)
-                                track8info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track8,
-                                                    track8uploader,
-                                                    track8time)
-                                self.bot_playlist_entries.append(track8info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track8, track8time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 8:
-                            self._temp_player_9 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist09 = self._temp_player_9.title
-                                playlist09time = self._temp_player_9.duration
-                                track9 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist09)
-                                fulldir = playlist09time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track9time = newdir
-                                track9uploader = str(
-                                    self._temp_player_9.uploader)
-                                track9info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track9,
-                                                    track9uploader,
-                                                    track9time)
-                                self.bot_playlist_entries.append(track9info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track9, track9time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 9:
-                            self._temp_player_10 = (
-                                await self.voice.create_ytdl_player(
-                                    data,
-                                    ytdl_options=self.ytdlo,
-                                    options=self.ffmop))
-                            self.bot_playlist.append(data)
-                            try:
-                                playlist10 = self._temp_player_10.title
-                                playlist10time = self._temp_player_10.duration
-                                track10 = str(
-                                    self.voice_text['play_command_data'][
-                                        10]).format(playlist10)
-                                fulldir = playlist10time
-                                minutes = str(int((fulldir / 60) % 60))
-                                seconds = str(int(fulldir % 60))
-                                if len(seconds) == 1:
-                                    seconds = "0" + seconds
-                                newdir = str(
-                                    self.voice_text['play_command_data'][
-                                        11]).format(minutes, seconds)
-                                track10time = newdir
-                                track10uploader = str(
-                                    self._temp_player_10.uploader)
-                                track10info = str(
-                                    self.voice_text['play_command_data'][
-                                        12]).format(track10,
-                                                    track10uploader,
-                                                    track10time)
-                                self.bot_playlist_entries.append(track10info)
-                                msgdata = str(
-                                    self.voice_text['play_command_data'][
-                                        13]).format(track10,
-                                                    track10time)
-                                message_data = msgdata
-                                await self.bot.send_message(
-                                    ctx.message.channel, content=message_data)
-                            except AttributeError:
-                                message_data = str(
-                                    self.voice_text['play_command_data'][
-                                        2])
-                                await self.bot.send_message(
-                                    self.voice_message_channel,
-                                    content=message_data)
-                        elif len(self.bot_playlist) == 10:
-                            msgdata = str(
-                                self.voice_text['play_command_data'][15])
-                            message_data = msgdata
-                            await self.bot.send_message(ctx.message.channel,
-                                                        content=message_data)
+        except discord.Forbidden:
+            pass
+
+    def format_track_title(self, track):
+        """
+        Formats the title of an queued song.
+        """
+        return str(
+            self.voice_text['play_command_data'][10]).format(track.title)
+
+    def format_track_time(self, track):
+        """
+        Formats the duration of an queued song.
+        """
+        minutes, seconds = split_duration(track.duration)
+        return str(
+            self.voice_text['play_command_data'][11]).format(
+            minutes, seconds)
 
-    # will be revised on next release of this cog!!!
+    def format_track_info(self, track):
+        """
+        Formats an queued song for the Playlist command.
+        """
+        return str(
+            self.voice_text['play_command_data'][12]).format(
+            self.format_track_title(track), track.uploader,
+            self.format_track_time(track))
 
     @commands.command(name='stop', pass_context=True, no_pm=True)
     async def stop_command(self, ctx):
@@ -1767,97 +3846,46 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice_message_channel is not None:
-            if ctx.message.channel.id == self.voice_message_channel.id:
-                if self.player is not None:
-                    fulldir = self.player.duration
-                    minutes = str(int((fulldir / 60) % 60))
-                    seconds = str(int(fulldir % 60))
-                    if len(seconds) == 1:
-                        seconds = "0" + seconds
-                    try:
-                        message_data = str(
-                            self.voice_text['stop_command_data'][
-                                0]).format(str(self.player.title),
-                                           str(self.player.uploader
-                                               ), minutes, seconds)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-                    self.player.stop()
-                    self.player = None
-                    self.is_bot_playing = False
-                    # Clean the temp players now...
-                    self.resolve_bot_playlist_issue()
-                    if len(self.bot_playlist) >= 1:
-                        try:
-                            track_data = None
-                            try:
-                                track_data = str(self.bot_playlist_entries[0])
-                            except IndexError:
-                                pass
-                            data = str(self.bot_playlist[0])
-                            self._sent_finished_message = False
-                            self.player = await self.voice.create_ytdl_player(
-                                data, ytdl_options=self.ytdlo,
-                                options=self.ffmop, after=self.voice_playlist)
-                            if self.player is not None:
-                                try:
-                                    self.bot_playlist.remove(data)
-                                    self.bot_playlist_entries.remove(
-                                        track_data)
-                                except ValueError:
-                                    pass
-                                if self.is_bot_playing is False:
-                                    self.is_bot_playing = True
-                                    try:
-                                        fulldir = self.player.duration
-                                        minutes = str(int((fulldir / 60) % 60))
-                                        seconds = str(int(fulldir % 60))
-                                        if len(seconds) == 1:
-                                            seconds = "0" + seconds
-                                        track_info = str(
-                                            self.voice_text[
-                                                'stop_command_data'
-                                            ][1]).format(
-                                            str(self.player.title),
-                                            str(self.player.uploader))
-                                        message_data = str(
-                                            self.voice_text[
-                                                'stop_command_data'][
-                                                2]).format(
-                                            track_info, minutes, seconds)
-                                        await self.bot.send_message(
-                                            self.voice_message_channel,
-                                            content=message_data)
-                                        try:
-                                            self.bot_playlist_entries.remove(
-                                                track_info)
-                                        except ValueError:
-                                            pass
-                                    except discord.Forbidden:
-                                        await self.resolve_send_message_error(
-                                            self.bot, ctx)
-                                    if self.player is not None:
-                                        self.player.start()
-                        except UnboundLocalError:
-                            self.player = None
-                            self.is_bot_playing = False
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            if session.player is not None:
+                minutes, seconds = split_duration(session.player.duration)
+                try:
+                    message_data = str(
+                        self.voice_text['stop_command_data'][
+                            0]).format(str(session.player.title),
+                                       str(session.player.uploader
+                                           ), minutes, seconds)
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    await self.bot.BotPMError.resolve_send_message_error(
+                        self.bot, ctx)
+                # clear the player first so the after callback knows the
+                # next track is started below.
+                player = session.player
+                session.player = None
+                player.stop()
+                player.resume()
+                session.is_bot_playing = False
+                self.reap_session(session)
+                if len(session.queue) >= 1:
+                    await self.play_next(session, 'stop_command_data')
                 else:
-                    try:
-                        message_data = str(
-                            self.voice_text['stop_command_data'][3])
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
+                    self.release_player(session)
             else:
-                return
-
-    # will be revised on next release of this cog!!!
+                try:
+                    message_data = str(
+                        self.voice_text['stop_command_data'][3])
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    await self.bot.BotPMError.resolve_send_message_error(
+                        self.bot, ctx)
 
     @commands.command(name='pause', pass_context=True, no_pm=True)
     async def pause_command(self, ctx):
@@ -1869,39 +3897,33 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice_message_channel is not None:
-            if ctx.message.channel.id == self.voice_message_channel.id:
-                if self.player is not None:
-                    fulldir = self.player.duration
-                    minutes = str(int((fulldir / 60) % 60))
-                    seconds = str(int(fulldir % 60))
-                    if len(seconds) == 1:
-                        seconds = "0" + seconds
-                    try:
-                        message_data = str(
-                            self.voice_text['pause_command_data'][
-                                0]).format(
-                            str(self.player.title), str(self.player.uploader),
-                            minutes, seconds)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-                    self.player.pause()
-                else:
-                    message_data = str(
-                        self.voice_text['pause_command_data'][1])
-                    await self.bot.send_message(self.voice_message_channel,
-                                                content=message_data)
-            else:
-                return
-        else:
+        session = self.get_session(ctx.message.server)
+        if session is None:
             message_data = str(self.voice_text['pause_command_data'][2])
             await self.bot.send_message(ctx.message.channel,
                                         content=message_data)
-
-    # will be revised on next release of this cog!!!
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            if session.player is not None:
+                minutes, seconds = split_duration(session.player.duration)
+                try:
+                    message_data = str(
+                        self.voice_text['pause_command_data'][
+                            0]).format(
+                        str(session.player.title),
+                        str(session.player.uploader),
+                        minutes, seconds)
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    await self.bot.BotPMError.resolve_send_message_error(
+                        self.bot, ctx)
+                pause_player(session.player)
+            else:
+                message_data = str(
+                    self.voice_text['pause_command_data'][1])
+                await self.bot.send_message(session.voice_message_channel,
+                                            content=message_data)
 
     @commands.command(name='unpause', pass_context=True, no_pm=True)
     async def unpause_command(self, ctx):
@@ -1913,44 +3935,38 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice_message_channel is not None:
-            if ctx.message.channel.id == self.voice_message_channel.id:
-                if self.player is not None:
-                    fulldir = self.player.duration
-                    minutes = str(int((fulldir / 60) % 60))
-                    seconds = str(int(fulldir % 60))
-                    if len(seconds) == 1:
-                        seconds = "0" + seconds
-                    try:
-                        message_data = str(
-                            self.voice_text['unpause_command_data'][
-                                0]).format(
-                            str(self.player.title), str(self.player.uploader),
-                            minutes, seconds)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-                    self.player.resume()
-                else:
-                    try:
-                        msgdata = str(
-                            self.voice_text['unpause_command_data'][1])
-                        message_data = msgdata
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-            else:
-                return
-        else:
+        session = self.get_session(ctx.message.server)
+        if session is None:
             message_data = str(self.voice_text['unpause_command_data'][2])
             await self.bot.send_message(ctx.message.channel,
                                         content=message_data)
-
-    # will be revised on next release of this cog!!!
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            if session.player is not None:
+                minutes, seconds = split_duration(session.player.duration)
+                try:
+                    message_data = str(
+                        self.voice_text['unpause_command_data'][
+                            0]).format(
+                        str(session.player.title),
+                        str(session.player.uploader),
+                        minutes, seconds)
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    await self.bot.BotPMError.resolve_send_message_error(
+                        self.bot, ctx)
+                session.player.resume()
+            else:
+                try:
+                    message_data = str(
+                        self.voice_text['unpause_command_data'][1])
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    await self.bot.BotPMError.resolve_send_message_error(
+                        self.bot, ctx)
 
     @commands.command(name='move', pass_context=True, no_pm=True)
     async def move_command(self, ctx):
@@ -1962,80 +3978,40 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice_message_channel is not None:
-            if ctx.message.channel.id == self.voice_message_channel.id:
-                if ctx.message.author.voice_channel != \
-                        ctx.message.channel.server.me.voice_channel:
-                    self.botvoicechannel['Bot_Current_Voice_Channel'].remove(
-                        self.vchannel.id)
-                    self.botvoicechannel['Bot_Current_Voice_Channel'].remove(
-                        self.voice_message_server.id)
-                    self.botvoicechannel['Bot_Current_Voice_Channel'].remove(
-                        self.voice_message_channel.id)
-                    self.botvoicechannel['Bot_Current_Voice_Channel'].remove(
-                        self.voice_message_server_name)
-                    self.botvoicechannel['Bot_Current_Voice_Channel'].remove(
-                        self.vchannel_name)
-                    self.vchannel = ctx.message.author.voice_channel
-                    self.vchannel_name = ctx.message.author.voice_channel.name
-                    if self.vchannel.id not in self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.vchannel.id)
-                    if self.voice_message_server.id not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_server.id)
-                    if self.voice_message_channel.id not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_channel.id)
-                    if self.voice_message_server_name not in \
-                            self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.voice_message_server_name)
-                    if self.vchannel_name not in self.botvoicechannel:
-                        self.botvoicechannel[
-                            'Bot_Current_Voice_Channel'].append(
-                            self.vchannel_name)
-                    file_name = os.path.join(
-                        sys.path[0], 'resources', 'ConfigData',
-                        'BotVoiceChannel.json')
-                    json.dump(self.botvoicechannel, open(file_name, "w"))
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            if ctx.message.author.voice_channel is not None and \
+                    ctx.message.author.voice_channel != \
+                    ctx.message.channel.server.me.voice_channel:
+                try:
+                    await session.move(ctx.message.author.voice_channel)
                     try:
-                        await self.voice.move_to(self.vchannel)
-                        try:
-                            message_data = str(
-                                self.voice_text['move_command_data'][
-                                    0]).format(self.vchannel.name)
-                            await self.bot.send_message(
-                                self.voice_message_channel,
-                                content=message_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                    except discord.InvalidArgument:
-                        try:
-                            message_data = str(
-                                self.voice_text['move_command_data'][1])
-                            await self.bot.send_message(
-                                self.voice_message_channel,
-                                content=message_data)
-                        except discord.Forbidden:
-                            await self.resolve_send_message_error(
-                                self.bot, ctx)
-                else:
-                    message_data = str(
-                        self.voice_text['move_command_data'][2])
-                    await self.bot.send_message(self.voice_message_channel,
-                                                content=message_data)
+                        message_data = str(
+                            self.voice_text['move_command_data'][
+                                0]).format(session.vchannel.name)
+                        await self.bot.send_message(
+                            session.voice_message_channel,
+                            content=message_data)
+                    except discord.Forbidden:
+                        await self.resolve_send_message_error(
+                            self.bot, ctx)
+                except discord.InvalidArgument:
+                    try:
+                        message_data = str(
+                            self.voice_text['move_command_data'][1])
+                        await self.bot.send_message(
+                            session.voice_message_channel,
+                            content=message_data)
+                    except discord.Forbidden:
+                        await self.resolve_send_message_error(
+                            self.bot, ctx)
             else:
-                return
-
-    # will be revised on next release of this cog!!!
+                message_data = str(
+                    self.voice_text['move_command_data'][2])
+                await self.bot.send_message(session.voice_message_channel,
+                                            content=message_data)
 
     @commands.command(name='LeaveVoiceChannel', pass_context=True, no_pm=True)
     async def leave_voice_channel_command(self, ctx):
@@ -2047,83 +4023,24 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice is not None:
-            if self.voice_message_channel is not None:
-                if ctx.message.channel.id == self.voice_message_channel.id:
-                    try:
-                        await self.voice.disconnect()
-                    except ConnectionResetError:
-                        # Supress a Error here.
-                        pass
-                    if self.vchannel is not None:
-                        try:
-                            self.botvoicechannel[
-                                'Bot_Current_Voice_Channel'].remove(
-                                self.vchannel.id)
-                        except ValueError:
-                            pass
-                        try:
-                            self.botvoicechannel[
-                                'Bot_Current_Voice_Channel'].remove(
-                                self.voice_message_server.id)
-                        except ValueError:
-                            pass
-                        try:
-                            self.botvoicechannel[
-                                'Bot_Current_Voice_Channel'].remove(
-                                self.voice_message_channel.id)
-                        except ValueError:
-                            pass
-                        try:
-                            self.botvoicechannel[
-                                'Bot_Current_Voice_Channel'].remove(
-                                self.voice_message_server_name)
-                        except ValueError:
-                            pass
-                        try:
-                            self.botvoicechannel[
-                                'Bot_Current_Voice_Channel'].remove(
-                                self.vchannel_name)
-                        except ValueError:
-                            pass
-                    filename = os.path.join(
-                        sys.path[0], 'resources', 'ConfigData',
-                        'BotVoiceChannel.json')
-                    json.dump(self.botvoicechannel, open(filename, "w"))
-                    try:
-                        try:
-                            message_data = str(
-                                self.voice_text[
-                                    'leave_voice_channel_command_data'
-                                ][0]).format(self.vchannel.name)
-                        except AttributeError:
-                            message_data = str(
-                                self.voice_text[
-                                    'leave_voice_channel_command_data'
-                                ][0]).format(self.vchannel_name)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        await self.bot.BotPMError.resolve_send_message_error(
-                            self.bot, ctx)
-                    self.vchannel = None
-                    self.voice_message_channel = None
-                    self.voice = None
-                    self.vchannel_name = None
-                    if self.player is not None:
-                        self.player = None
-                    self.voice_message_server = None
-                    if self.is_bot_playing:
-                        self.is_bot_playing = False
-                else:
-                    return
-        else:
+        session = self.get_session(ctx.message.server)
+        if session is None:
             msgdata = str(
                 self.voice_text['leave_voice_channel_command_data'][1])
             message_data = msgdata
             await self.bot.send_message(ctx.message.channel, message_data)
-
-    # will be revised on next release of this cog!!!
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            await self.leave_session(session)
+            try:
+                message_data = str(
+                    self.voice_text[
+                        'leave_voice_channel_command_data'
+                    ][0]).format(session.vchannel.name)
+                await self.bot.send_message(session.voice_message_channel,
+                                            content=message_data)
+            except discord.Forbidden:
+                await self.bot.BotPMError.resolve_send_message_error(
+                    self.bot, ctx)
 
     @commands.command(name='Playlist', pass_context=True, no_pm=True)
     async def playlist_command(self, ctx):
@@ -2135,216 +4052,23 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice is not None:
-            if self.voice_message_channel is not None:
-                if ctx.message.channel.id == self.voice_message_channel.id:
-                    track1 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track2 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track3 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track4 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track5 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track6 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track7 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track8 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track9 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    track10 = str(
-                        self.voice_text['playlist_command_data'][0])
-                    if len(self.bot_playlist_entries) == 0:
-                        track1 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track2 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track3 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track4 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track5 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 1:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track3 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track4 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track5 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 2:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track4 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track5 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 3:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track5 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 4:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 5:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 6:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(self.bot_playlist_entries[5])
-                        track7 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 7:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(self.bot_playlist_entries[5])
-                        track7 = str(self.bot_playlist_entries[6])
-                        track8 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 8:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(self.bot_playlist_entries[5])
-                        track7 = str(self.bot_playlist_entries[6])
-                        track8 = str(self.bot_playlist_entries[7])
-                        track9 = str(
-                            self.voice_text['playlist_command_data'][0])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 9:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(self.bot_playlist_entries[5])
-                        track7 = str(self.bot_playlist_entries[6])
-                        track8 = str(self.bot_playlist_entries[7])
-                        track9 = str(self.bot_playlist_entries[8])
-                        track10 = str(
-                            self.voice_text['playlist_command_data'][0])
-                    elif len(self.bot_playlist_entries) == 10:
-                        track1 = str(self.bot_playlist_entries[0])
-                        track2 = str(self.bot_playlist_entries[1])
-                        track3 = str(self.bot_playlist_entries[2])
-                        track4 = str(self.bot_playlist_entries[3])
-                        track5 = str(self.bot_playlist_entries[4])
-                        track6 = str(self.bot_playlist_entries[5])
-                        track7 = str(self.bot_playlist_entries[6])
-                        track8 = str(self.bot_playlist_entries[7])
-                        track9 = str(self.bot_playlist_entries[8])
-                        track10 = str(self.bot_playlist_entries[9])
-                    msgdata = str(
-                        self.voice_text['playlist_command_data'][
-                            1]).format(track1, track2, track3,
-                                       track4, track5, track6,
-                                       track7, track8, track9,
-                                       track10)
-                    message_data = msgdata
-                    await self.bot.send_message(ctx.message.channel,
-                                                content=message_data)
-
-    # will be revised on next release of this cog!!!
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            # the Playlist message only has room for 10 songs.
+            tracks = [self.format_track_info(track)
+                      for track in session.queue.peek(10)]
+            tracks += [str(self.voice_text['playlist_command_data'][0])
+                       ] * (10 - len(tracks))
+            message_data = str(
+                self.voice_text['playlist_command_data'][1]).format(
+                *tracks)
+            if len(session.queue) > 10:
+                message_data += "\nand {0} more.".format(
+                    len(session.queue) - 10)
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
 
     @commands.command(name='vol', pass_context=True, no_pm=True)
     async def vol_command(self, ctx):
@@ -2356,139 +4080,479 @@ class Voice:
             return
         if ctx.message.author.id in self.bot.banlist['Users']:
             return
-        elif self.voice_message_channel is not None:
-            if ctx.message.channel.id == self.voice_message_channel.id:
-                if self.player is not None:
-                    value_string = ctx.message.content.strip(
-                        ctx.prefix + "vol ")
-                    try:
-                        value = float(value_string) / 100
-                        if 0.0 <= value <= 2.0:
-                            self.player.volume = value
-                            value_message = str(
-                                self.voice_text['volume_command_data'][
-                                    0]).format(str(value * 100))
-                            await self.bot.send_message(
-                                self.voice_message_channel,
-                                content=value_message)
-                        else:
-                            await self.bot.send_message(
-                                self.voice_message_channel,
-                                content=str(
-                                    self.voice_text[
-                                        'volume_command_data'][1]))
-                    except ValueError:
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id == session.voice_message_channel.id:
+            if session.player is not None:
+                value_string = ctx.message.content[
+                    len(ctx.prefix + "vol "):].strip()
+                try:
+                    value = float(value_string) / 100
+                    if 0.0 <= value <= 2.0:
+                        session.volume = value
+                        if not getattr(session.player, 'passthrough',
+                                       False):
+                            self.set_volume(session, session.player)
+                        value_message = str(
+                            self.voice_text['volume_command_data'][
+                                0]).format(str(value * 100))
+                        if getattr(session.player, 'passthrough', False):
+                            value_message += (
+                                ' It will be used from the next song.')
                         await self.bot.send_message(
-                            self.voice_message_channel, content=str(
+                            session.voice_message_channel,
+                            content=value_message)
+                    else:
+                        await self.bot.send_message(
+                            session.voice_message_channel,
+                            content=str(
                                 self.voice_text[
-                                    'volume_command_data'
-                                ][2]))
-            else:
+                                    'volume_command_data'][1]))
+                except ValueError:
+                    await self.bot.send_message(
+                        session.voice_message_channel, content=str(
+                            self.voice_text[
+                                'volume_command_data'
+                            ][2]))
+        else:
+            await self.bot.send_message(
+                session.voice_message_channel, content=str(
+                    self.voice_text[
+                        'volume_command_data'
+                    ][3]))
+
+    @commands.command(name='history', pass_context=True, no_pm=True)
+    async def history_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        if self.history is None:
+            return
+        server_id = ctx.message.server.id
+        if ctx.message.content[
+                len(ctx.prefix + "history "):].strip() == 'top':
+            entries = self.history.top(server_id)
+            title = 'Most played songs:'
+        else:
+            entries = self.history.recent(server_id)
+            title = 'Last played songs, replay one with replay <number>:'
+        if entries:
+            message_data = '\n'.join([title] + [
+                '{0}. {1} ({2} plays)'.format(number, track.title, plays)
+                for number, (track, plays, played) in enumerate(
+                    entries, 1)])
+        else:
+            message_data = 'Nothing was played here yet.'
+        try:
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        except discord.Forbidden:
+            await self.resolve_send_message_error(self.bot, ctx)
+
+    @commands.command(name='replay', pass_context=True, no_pm=True)
+    async def replay_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        session = self.get_session(ctx.message.server)
+        if session is None or self.history is None:
+            return
+        elif ctx.message.channel.id != session.voice_message_channel.id:
+            return
+        try:
+            number = int(ctx.message.content[
+                len(ctx.prefix + "replay "):].strip() or 1)
+        except ValueError:
+            number = 0
+        entries = self.history.recent(session.server_id, max(number, 1))
+        if not 1 <= number <= len(entries):
+            await self.bot.send_message(
+                ctx.message.channel,
+                content='There is no song {0} in the history.'.format(
+                    number))
+            return
+        # the info cache most likely still has the song.
+        track = entries[number - 1][0]
+        if session.is_idle():
+            try:
+                await self.start_track(
+                    session, track,
+                    timeout=self.settings['admission_timeout'])
+            except BotErrors.MaxPlayersError as e:
+                await self.bot.send_message(ctx.message.channel,
+                                            content=str(e))
+            except youtube_dl.utils.DownloadError:
                 await self.bot.send_message(
-                    self.voice_message_channel, content=str(
-                        self.voice_text[
-                            'volume_command_data'
-                        ][3]))
+                    ctx.message.channel, content=str(
+                        self.voice_text['play_command_data'][7]))
+        elif self.queue_track(session, track):
+            message_data = str(
+                self.voice_text['play_command_data'][13]).format(
+                self.format_track_title(track),
+                self.format_track_time(track))
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        else:
+            message_data = str(
+                self.voice_text['play_command_data'][
+                    14 if track.key in session.queue else 15])
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+
+    @commands.command(name='sfx', pass_context=True, no_pm=True)
+    async def sfx_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id != session.voice_message_channel.id:
+            return
+        name = ctx.message.content[
+            len(ctx.prefix + "sfx "):].strip().lower()
+        message_data = None
+        if name not in self.clips:
+            message_data = 'Sound effects: {0}.'.format(
+                ', '.join(sorted(self.clips)) or 'none')
+        elif session.player is None or \
+                not isinstance(getattr(session.player, 'buff', None),
+                               PCMMixer):
+            message_data = ('Sound effects can only be played over a '
+                            'song that is not sent as is.')
+        else:
+            session.player.buff.add_clip(self.clips[name])
+        if message_data is not None:
+            try:
+                await self.bot.send_message(ctx.message.channel,
+                                            content=message_data)
+            except discord.Forbidden:
+                await self.resolve_send_message_error(self.bot, ctx)
+
+    @commands.command(name='quality', pass_context=True, no_pm=True)
+    async def quality_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id in self.bot.banlist['Users']:
+            return
+        session = self.get_session(ctx.message.server)
+        if session is None:
+            return
+        elif ctx.message.channel.id != session.voice_message_channel.id:
+            return
+        profiles = self.settings['encoding_profiles']
+        name = ctx.message.content[
+            len(ctx.prefix + "quality "):].strip().lower()
+        if name in profiles:
+            session.profile = name
+            if session.player is not None and \
+                    not getattr(session.player, 'passthrough', False):
+                self.apply_profile(session, profiles[name],
+                                   session.player)
+            message_data = 'Switched to the {0} quality.'.format(name)
+        else:
+            message_data = 'Quality: {0}, can be one of: {1}.'.format(
+                session.profile or self.settings['encoding_profile'],
+                ', '.join(sorted(profiles)))
+        try:
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        except discord.Forbidden:
+            await self.resolve_send_message_error(self.bot, ctx)
+
+    @commands.command(name='resolverstats', pass_context=True, no_pm=False)
+    async def resolverstats_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id != self.bot.BotConfig.discord_user_id:
+            return
+        stats = [self.resolver.format_stats(),
+                 self.audio_cache.format_stats(),
+                 self.supervisor.format_stats()]
+        if self.loudness is not None:
+            stats.append(self.loudness.format_stats())
+        try:
+            await self.bot.send_message(
+                ctx.message.channel,
+                content='```\n{0}\n```'.format('\n'.join(stats)))
+        except discord.Forbidden:
+            await self.resolve_send_message_error(self.bot, ctx)
+
+    @commands.command(name='voicestats', pass_context=True, no_pm=False)
+    async def voicestats_command(self, ctx):
+        """
+        Bot Voice Command.
+        :param ctx: Command Context.
+        """
+        if ctx.message.channel.id in self.bot.ignoreslist["channels"]:
+            return
+        if ctx.message.author.id != self.bot.BotConfig.discord_user_id:
+            return
+        sessions = list(self.voiceobjs.values())
+        stats = [self.metrics.format_stats(sessions),
+                 self.supervisor.format_stats(),
+                 self.player_limiter.format_stats('players'),
+                 self.resolve_limiter.format_stats('lookups')]
+        if self.workers is not None:
+            stats.append(self.workers.format_stats())
+        if self.warm_pool is not None:
+            stats.append(self.warm_pool.format_stats())
+        if self.library is not None:
+            stats.append('library: {0} files'.format(len(self.library)))
+        message_data = '```\n{0}\n```'.format('\n'.join(stats))
+        try:
+            file_name = self.dump_metrics()
+            message_data += '\nFull dump written to {0}'.format(file_name)
+        except OSError:
+            pass
+        try:
+            await self.bot.send_message(ctx.message.channel,
+                                        content=message_data)
+        except discord.Forbidden:
+            await self.resolve_send_message_error(self.bot, ctx)
+
+    def dump_metrics(self):
+        """
+        Writes every voice metric to voice_metrics.json in the
+        cache folder.
+
+        :return: path of the file.
+        """
+        data = self.metrics.as_dict(list(self.voiceobjs.values()))
+        data['resolver'] = self.resolver.get_stats()
+        data['ffmpeg_processes'] = len(self.supervisor)
+        file_name = get_cache_path(self.settings, 'voice_metrics.json')
+        with open(file_name, 'w') as metrics_file:
+            json.dump(data, metrics_file, indent=4, sort_keys=True)
+        return file_name
+
+    def reap_session(self, session):
+        """
+        Kills the ffmpeg processes of an VoiceChannel instance that
+        are not used by its player or the prefetched one.
+        """
+        keep = [session.player]
+        if session.prefetched is not None:
+            keep.append(session.prefetched[1])
+        self.supervisor.reap(session.server_id, keep)
 
-    def voice_playlist(self):
+    def voice_playlist(self, session):
         """
         Listens for when music stops playing.
         """
-        discord.compat.run_coroutine_threadsafe(self.playlist_iterator(),
-                                                loop=self.bot.loop)
+        discord.compat.run_coroutine_threadsafe(
+            self.playlist_iterator(session), loop=self.bot.loop)
+
+    def schedule_prefetch(self, session):
+        """
+        Starts the task that opens the next song of an VoiceChannel
+        instance shortly before the current song ends.
+        """
+        session.cancel_prefetch()
+        if session.player is not None and \
+                self.settings['prefetch_seconds'] > 0:
+            session.prefetch_task = asyncio.ensure_future(
+                self.prefetch_next(session, session.player),
+                loop=self.bot.loop)
+
+    async def prefetch_next(self, session, player):
+        """
+        Waits until the player is close to the end of its song and
+        then opens the stream of the next song in the playlist so it
+        can start right after it.
+        """
+        prefetch_seconds = self.settings['prefetch_seconds']
+        if not player.duration:
+            # live streams do not end on their own.
+            return
+        while not player.is_done():
+            remaining = (player.end or player.duration) - \
+                get_player_elapsed(player)
+            if remaining <= prefetch_seconds:
+                break
+            # a paused player will be checked again when this ends.
+            await asyncio.sleep(remaining - prefetch_seconds)
+        track = session.queue.first()
+        if track is None or session.player is not player:
+            return
+        session.prefetch_opening = True
+        try:
+            next_player = await self.create_player(session, track)
+        except youtube_dl.utils.DownloadError:
+            # play_next skips it when it is reached.
+            return
+        finally:
+            session.prefetch_opening = False
+        # play_next waits for it when the song was stopped meanwhile.
+        if session.player not in (player, None) or \
+                session.queue.first() is not track:
+            reap_player(next_player)
+            return
+        session.prefetched = (track, next_player)
+        crossfade = self.settings['crossfade_seconds']
+        if crossfade > 0 and isinstance(
+                getattr(player, 'buff', None), PCMMixer) and isinstance(
+                getattr(next_player, 'buff', None), PCMMixer):
+            await self.start_crossfade(session, player, next_player,
+                                       crossfade)
+
+    async def start_crossfade(self, session, player, next_player, seconds):
+        """
+        Waits until the player is seconds from the end of its song and
+        mixes the start of the prefetched song into it, which then
+        goes on from there.
+        """
+        remaining = seconds
+        while not player.is_done():
+            remaining = (player.end or player.duration) - \
+                get_player_elapsed(player)
+            if remaining <= seconds:
+                break
+            await asyncio.sleep(remaining - seconds)
+        if player.is_done() or session.player is not player or \
+                session.prefetched is None or \
+                session.prefetched[1] is not next_player:
+            return
+        frames = max(1, int(remaining / player.delay))
+        player.buff.crossfade(next_player.buff.source, frames,
+                              next_player.buff.gain)
+        # play_next adds what the fade played of the next song to its
+        # offset, the song can end or be stopped before it is done.
+        next_player.faded_by = player.buff
+
+    async def play_next(self, session, text_key):
+        """
+        Starts playing the first song in the playlist of an
+        VoiceChannel instance.
 
-    # will be revised on next release of this cog!!!
+        :param session: VoiceChannel instance.
+        :param text_key: key in voice.json holding the now
+            playing messages.
+        """
+        if session.starting:
+            # the song being started plays before the playlist.
+            return
+        requested = time.perf_counter()
+        session._sent_finished_message = False
+        player = None
+        session.starting = True
+        try:
+            if session.prefetch_opening:
+                # the next song is being opened already, use that
+                # player instead of opening it a second time.
+                await asyncio.wait([session.prefetch_task])
+            await self.acquire_player(session)
+            while player is None:
+                track = session.queue.get()
+                if track is None:
+                    session.player = None
+                    session.is_bot_playing = False
+                    self.release_player(session)
+                    return
+                player = session.take_prefetched(track)
+                if player is not None:
+                    mixer = getattr(player, 'faded_by', None)
+                    if mixer is not None:
+                        # the start of the song was played by the fade.
+                        player.offset += mixer.faded_frames * player.delay
+                    break
+                try:
+                    player = await self.create_player(session, track)
+                except youtube_dl.utils.DownloadError:
+                    # skip songs that can no longer be played.
+                    player = None
+        finally:
+            session.starting = False
+        session.player = player
+        self.reap_session(session)
+        if session.is_bot_playing is False:
+            session.is_bot_playing = True
+            self.playlists_changed = True
+            self.metrics.watch_first_frame(session.player, requested)
+            session.player.start()
+            self.schedule_prefetch(session)
+            self.record_play(session, track)
+            try:
+                minutes, seconds = split_duration(track.duration)
+                track_info = str(
+                    self.voice_text[text_key][1]).format(
+                    str(track.title), str(track.uploader))
+                message_data = str(
+                    self.voice_text[text_key][2]).format(
+                    track_info, minutes, seconds)
+                await self.bot.send_message(
+                    session.voice_message_channel,
+                    content=message_data)
+            except discord.Forbidden:
+                pass
 
-    async def playlist_iterator(self):
+    async def playlist_iterator(self, session):
         """
         Bot's Playlist Iterator.
         """
-        if self.player.error is None:
-            if self.voice_message_channel is not None:
-                fulldir = self.player.duration
-                minutes = str(int((fulldir / 60) % 60))
-                seconds = str(int(fulldir % 60))
-                if len(seconds) == 1:
-                    seconds = "0" + seconds
-                if self._sent_finished_message is False:
-                    self._sent_finished_message = True
-                    self.is_bot_playing = False
-                    # Clean the temp players now...
-                    self.resolve_bot_playlist_issue()
-                    try:
-                        message_data = str(
-                            self.voice_text['auto_playlist_data'][
-                                0]).format(
-                            str(self.player.title), str(self.player.uploader),
-                            minutes, seconds)
-                        await self.bot.send_message(self.voice_message_channel,
-                                                    content=message_data)
-                    except discord.Forbidden:
-                        pass
-                if len(self.bot_playlist) == 0:
-                    self.player = None
-                if len(self.bot_playlist) >= 1:
-                    try:
-                        track_data = None
-                        try:
-                            track_data = str(self.bot_playlist_entries[0])
-                        except IndexError:
-                            pass
-                        data = str(self.bot_playlist[0])
-                        self._sent_finished_message = False
-                        try:
-                            self.player = await self.voice.create_ytdl_player(
-                                data, ytdl_options=self.ytdlo,
-                                options=self.ffmop, after=self.voice_playlist)
-                        except AttributeError:
-                            self.is_bot_playing = False
-                        if self.player is not None:
-                            try:
-                                self.bot_playlist.remove(data)
-                            except ValueError:
-                                pass
-                            try:
-                                self.bot_playlist_entries.remove(track_data)
-                            except ValueError:
-                                pass
-                            if self.is_bot_playing is False:
-                                self.is_bot_playing = True
-                                try:
-                                    fulldir = self.player.duration
-                                    minutes = str(int((fulldir / 60) % 60))
-                                    seconds = str(int(fulldir % 60))
-                                    if len(seconds) == 1:
-                                        seconds = "0" + seconds
-                                    track_info = str(self.voice_text[
-                                                         'auto_playlist_data'][
-                                                         1]).format(
-                                        str(self.player.title),
-                                        str(self.player.uploader))
-                                    message_data = str(
-                                        self.voice_text[
-                                            'auto_playlist_data'
-                                        ][2]).format(track_info, minutes,
-                                                     seconds)
-                                    await self.bot.send_message(
-                                        self.voice_message_channel,
-                                        content=message_data)
-                                    try:
-                                        self.bot_playlist_entries.remove(
-                                            track_info)
-                                    except ValueError:
-                                        pass
-                                except discord.Forbidden:
-                                    pass
-                                if self.player is not None:
-                                    self.player.start()
-                    except UnboundLocalError:
-                        self.is_bot_playing = False
+        player = session.player
+        if player is None or not player.is_done():
+            # this player was stopped by a command that
+            # already handled what plays next.
+            return
+        if self.voiceobjs.get(session.server_id) is not session:
+            return
+        if player.error is None:
+            minutes, seconds = split_duration(player.duration)
+            if session._sent_finished_message is False:
+                session._sent_finished_message = True
+                session.is_bot_playing = False
+                try:
+                    message_data = str(
+                        self.voice_text['auto_playlist_data'][
+                            0]).format(
+                        str(player.title), str(player.uploader),
+                        minutes, seconds)
+                    await self.bot.send_message(
+                        session.voice_message_channel,
+                        content=message_data)
+                except discord.Forbidden:
+                    pass
+            if len(session.queue) == 0:
+                session.player = None
+                self.reap_session(session)
+                self.release_player(session)
+            else:
+                await self.play_next(session, 'auto_playlist_data')
         else:
-            if self.voice_message_channel is not None:
-                await self.bot.send_message(
-                    self.voice_message_channel,
-                    content="A Error Occured while playing. {0}".format(
-                        self.player.error))
+            session.player = None
+            session.is_bot_playing = False
+            self.reap_session(session)
+            self.release_player(session)
+            self.metrics.incr('player_errors')
+            await self.bot.send_message(
+                session.voice_message_channel,
+                content="A Error Occured while playing. {0}".format(
+                    player.error))
 
 
 def setup(bot):